@@ -0,0 +1,387 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy
+
+from app.model.storage import readArray, readMetadata, writeArray, writeMetadata
+
+
+class Vocabulary:
+    '''
+        This Class maps every distinct token to an integer id, ids are given in order of first appearance
+
+        Methods:
+        --------
+            intern:
+                This method returns the id of a token, adding the token if it is new
+            encode:
+                This method returns the sorted and deduplicated ids of a tweet
+            lookup:
+                This method returns the ids of a tweet without adding its unknown tokens
+            decode:
+                This method returns the tokens of a list of ids
+
+
+        Example:
+        --------
+            >>> vocabulary = Vocabulary()
+            >>> vocabulary.encode(['b', 'a', 'b'])
+            array([0, 1], dtype=int32)
+            >>> vocabulary.decode([1, 0])
+            ['a', 'b']
+    '''
+
+    def __init__(self, tokens: Iterable[str] = ()):
+        self.__ids: Dict[str, int] = {}
+        self.__tokens: List[str] = []
+        for token in tokens:
+            self.intern(token)
+
+    def __len__(self) -> int:
+        return len(self.__tokens)
+
+    def __getstate__(self):
+        # the ids are rebuilt from the tokens order, so only the tokens are pickled
+        return self.__tokens
+
+    def __setstate__(self, tokens: List[str]):
+        self.__tokens = tokens
+        self.__ids = {token: tokenId for tokenId, token in enumerate(tokens)}
+
+    def __contains__(self, token: str) -> bool:
+        return token in self.__ids
+
+    def intern(self, token: str) -> int:
+        tokenId = self.__ids.get(token)
+        if tokenId is None:
+            tokenId = self.__ids[token] = len(self.__tokens)
+            self.__tokens.append(token)
+        return tokenId
+
+    def encode(self, tweet: Iterable[str]) -> numpy.ndarray:
+        return numpy.array(sorted({self.intern(token) for token in tweet}), dtype=numpy.int32)
+
+    def lookup(self, tweet: Iterable[str], unknownIds: Dict[str, int]) -> numpy.ndarray:
+        '''
+            This method returns the sorted and deduplicated ids of a tweet without changing the vocabulary
+            The unknown tokens get ids from len(vocabulary) on, kept in unknownIds so the same unknown token
+            gets the same id in every tweet encoded with the same dictionary
+
+            Parameters:
+            -----------
+                tweet:
+                    The tokens of the tweet
+
+                unknownIds:
+                    The ids given to the unknown tokens, above the vocabulary ids, updated in place
+
+            Returns:
+            --------
+                The int32 ids of the tweet
+        '''
+        ids = set()
+        for token in tweet:
+            tokenId = self.__ids.get(token)
+            if tokenId is None:
+                tokenId = len(self.__tokens) + unknownIds.setdefault(token, len(unknownIds))
+            ids.add(tokenId)
+        return numpy.array(sorted(ids), dtype=numpy.int32)
+
+    def decode(self, ids: Iterable[int]) -> List[str]:
+        return [self.__tokens[tokenId] for tokenId in ids]
+
+    def getTokens(self) -> List[str]:
+        return self.__tokens
+
+
+class Corpus:
+    '''
+        This Class stores a set of tweets as interned token ids inside one flat buffer
+        The ids of tweet i are tokens[offsets[i]:offsets[i + 1]], sorted and deduplicated,
+        so a tweet costs 4 bytes per distinct token instead of a list of python strings
+
+        The corpus behaves like a sequence of tweets, indexing it returns the tokens of a tweet,
+        so it can be given to KMeans.fit in place of a list of lists of strings
+
+        Methods:
+        --------
+            fromTweets:
+                This method builds a corpus from a list of tokenized tweets
+            fromTexts:
+                This method builds a corpus from a list of raw tweet texts
+            fromRows:
+                This method builds a corpus from tweets already encoded as token ids
+            append:
+                This method returns a corpus with more tweets added at the end
+            ids:
+                This method returns the token ids of a tweet
+            distance:
+                This method returns the jaccard distance between two tweets using a sorted merge
+            deduplicate:
+                This method collapses the tweets with identical token sets
+            save:
+                This method writes the corpus and its vocabulary as flat binary arrays
+            load:
+                This method reads a saved corpus, memory mapping its arrays
+            subset:
+                This method returns a corpus of some of the tweets
+
+
+        Attributes:
+        -----------
+            vocabulary:
+                The vocabulary used to intern the tokens
+            tokens:
+                The int32 flat buffer of the token ids of all tweets
+            offsets:
+                The int64 offsets of every tweet inside tokens, of length len(corpus) + 1
+
+
+        Example:
+        --------
+            >>> corpus = Corpus.fromTexts(['a b c', 'a b d'])
+            >>> len(corpus)
+            2
+            >>> corpus[1]
+            ['a', 'b', 'd']
+            >>> corpus.distance(0, 1)
+            0.5
+    '''
+
+    def __init__(self, vocabulary: Vocabulary, tokens: numpy.ndarray, offsets: numpy.ndarray):
+        self.vocabulary = vocabulary
+        self.tokens = numpy.asarray(tokens, dtype=numpy.int32)
+        self.offsets = numpy.asarray(offsets, dtype=numpy.int64)
+
+    @staticmethod
+    def fromTweets(tweets: Iterable[Iterable[str]], vocabulary: Optional[Vocabulary] = None) -> 'Corpus':
+        '''
+            This method builds a corpus from tokenized tweets
+
+            Parameters:
+            -----------
+                tweets:
+                    The tweets represented as lists of strings
+
+                vocabulary:
+                    An existing vocabulary to extend, a new one is created if not given
+
+            Returns:
+            --------
+                The corpus of the tweets
+        '''
+        vocabulary = Vocabulary() if vocabulary is None else vocabulary
+        return Corpus.fromRows(vocabulary, [vocabulary.encode(tweet) for tweet in tweets])
+
+    @staticmethod
+    def fromRows(vocabulary: Vocabulary, rows: List[numpy.ndarray]) -> 'Corpus':
+        '''
+            This method builds a corpus from already encoded tweets
+
+            Parameters:
+            -----------
+                vocabulary:
+                    The vocabulary the rows were encoded with
+
+                rows:
+                    The sorted and deduplicated token ids of every tweet
+
+            Returns:
+            --------
+                The corpus of the rows
+        '''
+        offsets = numpy.zeros(len(rows) + 1, dtype=numpy.int64)
+        numpy.cumsum([len(row) for row in rows], out=offsets[1:])
+        tokens = numpy.concatenate(rows) if rows else numpy.empty(0, dtype=numpy.int32)
+        return Corpus(vocabulary, tokens, offsets)
+
+    @staticmethod
+    def fromTexts(texts: Iterable[str], vocabulary: Optional[Vocabulary] = None) -> 'Corpus':
+        return Corpus.fromTweets((text.split() for text in texts), vocabulary)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> List[str]:
+        return self.vocabulary.decode(self.ids(index))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def ids(self, index: int) -> numpy.ndarray:
+        return self.tokens[self.offsets[index]:self.offsets[index + 1]]
+
+    def lengths(self) -> numpy.ndarray:
+        return numpy.diff(self.offsets)
+
+    def distance(self, first: int, second: int) -> float:
+        '''
+            This method calculates the jaccard distance between two tweets
+            The ids of both tweets are sorted, so the intersection is found by binary searching
+            the ids of one tweet inside the other instead of hashing tokens into sets
+
+            Parameters:
+            -----------
+                first:
+                    The index of the first tweet
+
+                second:
+                    The index of the second tweet
+
+            Returns:
+            --------
+                The distance between the two tweets
+        '''
+        ids1, ids2 = self.ids(first), self.ids(second)
+        if len(ids1) == 0 or len(ids2) == 0:
+            return 0.0 if len(ids1) == len(ids2) else 1.0
+
+        positions = numpy.searchsorted(ids2, ids1).clip(max=len(ids2) - 1)
+        intersection = int(numpy.count_nonzero(ids2[positions] == ids1))
+        return 1 - (intersection / (len(ids1) + len(ids2) - intersection))
+
+    def subset(self, indices: Iterable[int]) -> 'Corpus':
+        '''
+            This method builds a corpus of the given tweets, sharing the same vocabulary
+
+            Parameters:
+            -----------
+                indices:
+                    The indices of the tweets to keep, in order
+
+            Returns:
+            --------
+                The corpus of the selected tweets
+        '''
+        indices = numpy.asarray(list(indices), dtype=numpy.int64)
+        lengths = self.lengths()[indices]
+        offsets = numpy.zeros(len(indices) + 1, dtype=numpy.int64)
+        numpy.cumsum(lengths, out=offsets[1:])
+        positions = numpy.repeat(self.offsets[indices] - offsets[:-1], lengths) + numpy.arange(offsets[-1])
+        return Corpus(self.vocabulary, self.tokens[positions], offsets)
+
+    def deduplicate(self):
+        '''
+            This method collapses the tweets with identical token sets into unique entries
+            Retweets and reposted headlines become the same token set once links and mentions are removed
+
+            Parameters:
+            -----------
+                None
+
+            Returns:
+            --------
+                A tuple of (unique, weights, inverse) where unique is the corpus of the distinct token sets
+                in order of first appearance, weights[u] is the number of tweets of the unique entry u
+                and inverse[i] is the unique entry of the tweet i, so unique[inverse[i]] has the tokens of tweet i
+
+            Example:
+            --------
+                >>> corpus = Corpus.fromTexts(['a b', 'c', 'b a'])
+                >>> unique, weights, inverse = corpus.deduplicate()
+                >>> len(unique), weights, inverse
+                (2, array([2, 1]), array([0, 1, 0]))
+        '''
+        firstIndices: Dict[bytes, int] = {}
+        inverse = numpy.empty(len(self), dtype=numpy.int64)
+        for index in range(len(self)):
+            inverse[index] = firstIndices.setdefault(self.ids(index).tobytes(), len(firstIndices))
+
+        unique = self.subset(firstIndices.values())
+        weights = numpy.bincount(inverse, minlength=len(unique))
+        return unique, weights, inverse
+
+    def append(self, tweets: Iterable[Iterable[str]]) -> 'Corpus':
+        '''
+            This method builds a corpus of these tweets followed by new tweets, encoded with the same vocabulary
+            The tweets of this corpus keep their indices
+
+            Parameters:
+            -----------
+                tweets:
+                    The new tweets represented as lists of strings
+
+            Returns:
+            --------
+                The extended corpus
+        '''
+        added = Corpus.fromTweets(tweets, self.vocabulary)
+        offsets = numpy.concatenate((self.offsets, added.offsets[1:] + self.offsets[-1]))
+        return Corpus(self.vocabulary, numpy.concatenate((self.tokens, added.tokens)), offsets)
+
+    def writeArrays(self, directory: str) -> dict:
+        '''
+            This method writes the token ids, the offsets and the vocabulary as flat binary arrays
+            The vocabulary is one utf-8 buffer of all the tokens with the offsets of every token
+
+            Parameters:
+            -----------
+                directory:
+                    The directory to write in, it is created if needed
+
+            Returns:
+            --------
+                The descriptions of the written arrays
+        '''
+        encodedTokens = [token.encode('utf-8') for token in self.vocabulary.getTokens()]
+        vocabularyOffsets = numpy.zeros(len(encodedTokens) + 1, dtype=numpy.int64)
+        numpy.cumsum([len(token) for token in encodedTokens], out=vocabularyOffsets[1:])
+        return {
+            'tokens': writeArray(directory, 'tokens', self.tokens),
+            'offsets': writeArray(directory, 'offsets', self.offsets),
+            'vocabulary': writeArray(directory, 'vocabulary', numpy.frombuffer(b''.join(encodedTokens), dtype=numpy.uint8)),
+            'vocabularyOffsets': writeArray(directory, 'vocabularyOffsets', vocabularyOffsets),
+        }
+
+    @staticmethod
+    def readArrays(directory: str, descriptions: dict, mmap=True) -> 'Corpus':
+        '''
+            This method reads a corpus written by writeArrays
+
+            Parameters:
+            -----------
+                directory:
+                    The directory to read from
+
+                descriptions:
+                    The descriptions returned by writeArrays
+
+                mmap:
+                    If True the token ids and offsets are memory mapped instead of being loaded in memory
+
+            Returns:
+            --------
+                The corpus
+        '''
+        buffer = readArray(directory, 'vocabulary', descriptions['vocabulary'], mmap=False).tobytes()
+        vocabularyOffsets = readArray(directory, 'vocabularyOffsets', descriptions['vocabularyOffsets'], mmap=False).tolist()
+        vocabulary = Vocabulary(buffer[start:end].decode('utf-8') for start, end in zip(vocabularyOffsets, vocabularyOffsets[1:]))
+        return Corpus(
+            vocabulary,
+            readArray(directory, 'tokens', descriptions['tokens'], mmap),
+            readArray(directory, 'offsets', descriptions['offsets'], mmap),
+        )
+
+    def save(self, directory: str) -> None:
+        '''
+            This method saves the corpus in a directory
+
+            Parameters:
+            -----------
+                directory:
+                    The directory to save in, it is created if needed
+
+            Returns:
+            --------
+                None
+
+            Example:
+            --------
+                >>> corpus.save('models/bbchealth')
+                >>> corpus = Corpus.load('models/bbchealth')
+        '''
+        writeMetadata(directory, {'corpus': self.writeArrays(directory)})
+
+    @staticmethod
+    def load(directory: str, mmap=True) -> 'Corpus':
+        return Corpus.readArrays(directory, readMetadata(directory)['corpus'], mmap)
@@ -0,0 +1,287 @@
+from typing import List, Optional, Sequence, Union
+
+import numpy
+
+from app.model.corpus import Corpus
+
+
+class SetJaccard:
+    '''
+        This Class computes the jaccard distance between tweets using python sets
+        It is the reference backend and it keeps the behavior of the original implementation
+
+        Methods:
+        --------
+            distance:
+                This method returns the jaccard distance between two tweets
+            distances:
+                This method returns a block of jaccard distances between two groups of tweets
+            pairDistances:
+                This method returns the jaccard distances of a list of pairs of tweets
+
+
+        Example:
+        --------
+            >>> tweets = [['a', 'b', 'c'], ['a', 'b', 'd']]
+
+            >>> backend = SetJaccard(tweets)
+            >>> backend.distance(0, 1)
+            0.5
+    '''
+
+    def __init__(self, tweets: Union[List[List[str]], Corpus]):
+        self.__tweets = tweets
+
+    def __len__(self) -> int:
+        return len(self.__tweets)
+
+    def distance(self, first: int, second: int) -> float:
+        '''
+            This method calculates the jaccard distance between two tweets
+
+            Parameters:
+            -----------
+                first:
+                    The index of the first tweet
+
+                second:
+                    The index of the second tweet
+
+            Returns:
+            --------
+                The distance between the two tweets
+        '''
+        tweet1, tweet2 = self.__tweets[first], self.__tweets[second]
+        union = len(set().union(tweet1, tweet2))
+        if union == 0:
+            return 0.0
+        return 1 - (len(set(tweet1).intersection(tweet2)) / union)
+
+    def distances(self, rows: Sequence[int], columns: Sequence[int]) -> numpy.ndarray:
+        '''
+            This method calculates the jaccard distances between every row tweet and every column tweet
+
+            Parameters:
+            -----------
+                rows:
+                    The indices of the row tweets
+
+                columns:
+                    The indices of the column tweets
+
+            Returns:
+            --------
+                A float64 array of shape (len(rows), len(columns))
+        '''
+        result = numpy.empty((len(rows), len(columns)), dtype=numpy.float64)
+        for rowIndex, row in enumerate(rows):
+            for columnIndex, column in enumerate(columns):
+                result[rowIndex, columnIndex] = self.distance(row, column)
+        return result
+
+    def pairDistances(self, first: Sequence[int], second: Sequence[int]) -> numpy.ndarray:
+        '''
+            This method calculates the jaccard distance of every pair (first[i], second[i])
+
+            Parameters:
+            -----------
+                first:
+                    The indices of the first tweet of every pair
+
+                second:
+                    The indices of the second tweet of every pair
+
+            Returns:
+            --------
+                A float64 array of length len(first)
+        '''
+        return numpy.array([self.distance(a, b) for a, b in zip(first, second)], dtype=numpy.float64)
+
+
+class SparseJaccard:
+    '''
+        This Class computes the jaccard distance between tweets using a sparse binary token matrix
+        Every tweet is encoded once as a row of a CSR matrix (indptr, indices) of deduplicated token ids,
+        which is the flat buffer of a Corpus, then distances to a tweet are computed for a whole group of rows using numpy operations
+
+        Methods:
+        --------
+            distance:
+                This method returns the jaccard distance between two tweets
+            distances:
+                This method returns a block of jaccard distances between two groups of tweets
+            pairDistances:
+                This method returns the jaccard distances of a list of pairs of tweets
+            tokenDistances:
+                This method returns the jaccard distances between tweets and a set of token ids
+
+
+        Attributes:
+        -----------
+            __corpus:
+                The encoded tweets, built from the tweets if they are not already a Corpus
+            __indptr:
+                The offsets of every row inside __indices
+            __indices:
+                The token ids of every row, sorted and deduplicated inside each row
+            __lengths:
+                The number of distinct tokens of every row
+            __vocabularySize:
+                The number of distinct tokens in the corpus
+
+
+        Example:
+        --------
+            >>> tweets = [['a', 'b', 'c'], ['a', 'b', 'd']]
+
+            >>> backend = SparseJaccard(tweets)
+            >>> backend.distances([0, 1], [1])
+            array([[0.5],
+                   [0. ]])
+    '''
+
+    def __init__(self, tweets: Union[List[List[str]], Corpus], vocabularySize: Optional[int] = None):
+        self.__corpus = tweets if isinstance(tweets, Corpus) else Corpus.fromTweets(tweets)
+        self.__indptr = self.__corpus.offsets
+        self.__indices = self.__corpus.tokens
+        self.__lengths = self.__corpus.lengths()
+        # the size is given when the vocabulary itself is not available, like in worker processes
+        self.__vocabularySize = len(self.__corpus.vocabulary) if vocabularySize is None else vocabularySize
+
+    def __len__(self) -> int:
+        return len(self.__lengths)
+
+    def distance(self, first: int, second: int) -> float:
+        return self.__corpus.distance(first, second)
+
+    def getCorpus(self) -> Corpus:
+        return self.__corpus
+
+    def distances(self, rows: Sequence[int], columns: Sequence[int]) -> numpy.ndarray:
+        '''
+            This method calculates the jaccard distances between every row tweet and every column tweet
+            The row tweets are gathered into one sub matrix, then for every column tweet a boolean
+            token mask is used to count the intersections of all rows at once
+
+            Parameters:
+            -----------
+                rows:
+                    The indices of the row tweets
+
+                columns:
+                    The indices of the column tweets
+
+            Returns:
+            --------
+                A float64 array of shape (len(rows), len(columns))
+        '''
+        rows = numpy.asarray(rows, dtype=numpy.int64)
+        indptr, indices = self.__gather(rows)
+        rowLengths = self.__lengths[rows]
+
+        result = numpy.empty((len(rows), len(columns)), dtype=numpy.float64)
+        mask = numpy.zeros(self.__vocabularySize, dtype=bool)
+        for columnIndex, column in enumerate(columns):
+            columnTokens = self.__indices[self.__indptr[column]:self.__indptr[column + 1]]
+            result[:, columnIndex] = self.__maskedDistances(indptr, indices, rowLengths, columnTokens, mask)
+        return result
+
+    def tokenDistances(self, rows: Sequence[int], tokenIds: numpy.ndarray) -> numpy.ndarray:
+        '''
+            This method calculates the jaccard distances between every row tweet and a set of token ids
+            which does not have to be a tweet of the corpus, like the prototype of a cluster
+
+            Parameters:
+            -----------
+                rows:
+                    The indices of the row tweets
+
+                tokenIds:
+                    The distinct token ids of the set
+
+            Returns:
+            --------
+                A float64 array of length len(rows)
+        '''
+        rows = numpy.asarray(rows, dtype=numpy.int64)
+        indptr, indices = self.__gather(rows)
+        mask = numpy.zeros(self.__vocabularySize, dtype=bool)
+        return self.__maskedDistances(indptr, indices, self.__lengths[rows], tokenIds, mask)
+
+    def __maskedDistances(self, indptr, indices, rowLengths, tokenIds, mask) -> numpy.ndarray:
+        mask[tokenIds] = True
+        # running count of hits, the hits of a row are the difference at its boundaries
+        hits = numpy.concatenate(([0], numpy.cumsum(mask[indices])))
+        intersections = hits[indptr[1:]] - hits[indptr[:-1]]
+        mask[tokenIds] = False
+
+        unions = rowLengths + len(tokenIds) - intersections
+        return self.__jaccard(intersections, unions)
+
+    def pairDistances(self, first: Sequence[int], second: Sequence[int]) -> numpy.ndarray:
+        '''
+            This method calculates the jaccard distance of every pair (first[i], second[i])
+            The token ids of both sides are keyed by their pair, then all keys are sorted together,
+            a key that appears twice is a token shared by both tweets of its pair
+
+            Parameters:
+            -----------
+                first:
+                    The indices of the first tweet of every pair
+
+                second:
+                    The indices of the second tweet of every pair
+
+            Returns:
+            --------
+                A float64 array of length len(first)
+        '''
+        first = numpy.asarray(first, dtype=numpy.int64)
+        second = numpy.asarray(second, dtype=numpy.int64)
+        pairs = numpy.arange(len(first), dtype=numpy.int64)
+        vocabularySize = max(self.__vocabularySize, 1)
+
+        keys = []
+        for side in (first, second):
+            _, indices = self.__gather(side)
+            keys.append(numpy.repeat(pairs, self.__lengths[side]) * vocabularySize + indices)
+        keys = numpy.sort(numpy.concatenate(keys))
+
+        shared = keys[1:][keys[1:] == keys[:-1]]
+        intersections = numpy.bincount(shared // vocabularySize, minlength=len(first))
+        unions = self.__lengths[first] + self.__lengths[second] - intersections
+        return self.__jaccard(intersections, unions)
+
+    @staticmethod
+    def __jaccard(intersections: numpy.ndarray, unions: numpy.ndarray) -> numpy.ndarray:
+        # two empty tweets are identical, avoid dividing by zero
+        distances = numpy.zeros(len(unions), dtype=numpy.float64)
+        nonEmpty = unions > 0
+        distances[nonEmpty] = 1 - intersections[nonEmpty] / unions[nonEmpty]
+        return distances
+
+    def __gather(self, rows: numpy.ndarray):
+        '''
+            This method builds the CSR sub matrix of the given rows
+
+            Parameters:
+            -----------
+                rows:
+                    The indices of the rows to gather
+
+            Returns:
+            --------
+                A tuple of (indptr, indices) of the sub matrix
+        '''
+        lengths = self.__lengths[rows]
+        indptr = numpy.zeros(len(rows) + 1, dtype=numpy.int64)
+        numpy.cumsum(lengths, out=indptr[1:])
+        # position of every gathered token inside the full indices array
+        positions = numpy.repeat(self.__indptr[rows] - indptr[:-1], lengths) + numpy.arange(indptr[-1])
+        return indptr, self.__indices[positions]
+
+
+BACKENDS = {
+    'set': SetJaccard,
+    'sparse': SparseJaccard,
+}
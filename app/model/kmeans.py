@@ -1,22 +1,111 @@
+import math
 import random
-from typing import List
+import time
+from collections.abc import Mapping
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy
+
+from app.model.corpus import Corpus
+from app.model.jaccard import BACKENDS, SparseJaccard
+from app.model.minhash import MinHashLSH
+from app.model.parallel import DistancePool
+from app.model.storage import readArray, readMetadata, writeArray, writeMetadata
+
+MEDOID_UPDATES = ('exact', 'sampled', 'prototype')
+
+INITIALIZATIONS = ('random', 'kmedoids++', 'greedy')
+
+# blocks smaller than this many distances are computed in the main process, the pool overhead is not worth it
+PARALLEL_MINIMUM_BLOCK = 100_000
+
+# margin kept when comparing bounds, so float rounding can never prune a tweet that is not strictly closer
+BOUND_EPSILON = 1e-9
+
+
+class FitCancelled(Exception):
+    '''
+        Raised by KMeans.fit when its cancellation token is set, the model is left unfitted
+    '''
+
+
+class ClustersView(Mapping):
+    '''
+        This Class is a read only view of the clusters of a fitted model, in the format of the original getClusters:
+        a mapping from the index of every cluster to the list of the [tweet, distance] pairs of its members
+        The members of a cluster are only gathered from the labels array when the cluster is accessed
+
+        Example:
+        --------
+            >>> clusters = kmeans.getClusters()
+            >>> len(clusters[0])
+            412
+            >>> clusters[0][0]
+            [['ebola', 'outbreak', 'spreads'], 0.6]
+    '''
+
+    def __init__(self, tweets, labels: numpy.ndarray, distances: numpy.ndarray, clustersCount: int):
+        self.__tweets = tweets
+        self.__distances = distances
+        self.__order = numpy.argsort(labels, kind='stable')
+        self.__bounds = numpy.concatenate(([0], numpy.bincount(labels, minlength=clustersCount).cumsum()))
+
+    def __getitem__(self, cluster: int) -> List[list]:
+        if not 0 <= cluster < len(self.__bounds) - 1 or self.__bounds[cluster] == self.__bounds[cluster + 1]:
+            raise KeyError(cluster)
+        members = self.__order[self.__bounds[cluster]:self.__bounds[cluster + 1]].tolist()
+        return [[self.__tweets[member], float(self.__distances[member])] for member in members]
+
+    def __iter__(self):
+        for cluster in range(len(self.__bounds) - 1):
+            if self.__bounds[cluster] < self.__bounds[cluster + 1]:
+                yield cluster
+
+    def __len__(self) -> int:
+        return int(numpy.count_nonzero(numpy.diff(self.__bounds)))
 
 
 class KMeans:
     '''
         This Class is used to Perform K-Means Clustering on a given set of tweets
-        The tweets are represented as a list of lists of strings
+        The tweets are represented as a list of lists of strings or as an encoded Corpus
 
         Methods:
         --------
             fit:
                 This method takes a list of tweets as input and performs k-means clustering on it
+            predict:
+                This method returns the closest centroid of new tweets
+            partialFit:
+                This method adds new tweets to the fitted clusters and elects again the medoids that drifted
+            save:
+                This method writes the fitted model and its encoded tweets as flat binary arrays
+            load:
+                This method reopens a saved model, memory mapping its arrays
             getCentroids:
                 This method returns the centroids of the clusters formed
             getClusters:
-                This method returns the clusters formed
+                This method returns a view of the clusters formed, mapping every cluster to its [tweet, distance] pairs
+            getLabels:
+                This method returns the index of the centroid of every tweet
+            getDistances:
+                This method returns the distance of every tweet to its centroid
+            getCentroidIndices:
+                This method returns the indices of the centroids in the fitted tweets
             getSSE:
                 This method returns the sum of squared errors of the clusters formed
+            getSSEHistory:
+                This method returns the sum of squared errors of the assignment of every iteration
+            getClusterSSE:
+                This method returns the sum of squared errors of every cluster
+            getLSHRecall:
+                This method returns the recall of the LSH assignment of every iteration
+            getSkippedDistances:
+                This method returns the number of distance computations skipped by pruning in every iteration
+            getDrift:
+                This method returns the fraction of members every cluster gained since its medoid was elected
+            getIterationCount:
+                This method returns the number of iterations performed before convergence
 
 
         Attributes:
@@ -25,18 +114,89 @@ class KMeans:
                 The number of clusters to be formed
             __maxIterations:
                 The maximum number of iterations to be performed
+            __tolerance:
+                The fit stops when at most this fraction of the tweets sharing a token with their centroid changed
+                cluster in an iteration, None to only stop when the centroids do not change
+            __sseTolerance:
+                The fit stops when the SSE of an assignment improved by at most this fraction of the previous SSE,
+                None to disable this check
+            __distance:
+                The name of the distance backend, 'sparse' (default) or 'set',
+                or a backend instance already built over the tweets given to fit, like a shared DistanceCache
+            __backend:
+                The distance backend built over the tweets in fit
+            __medoidUpdate:
+                How the medoid of a cluster is elected:
+                'exact' computes every pairwise distance inside the cluster in blocks of chunkSize distances,
+                'sampled' only evaluates medoidSamples random members (and the current medoid) as candidates,
+                'prototype' builds the most frequent tokens of the cluster and elects the member closest to them
+            __medoidSamples:
+                The number of candidate members evaluated by the 'sampled' medoid update
+            __chunkSize:
+                The maximum number of distances held in memory at once by the medoid update
+            __lsh:
+                The optional MinHash LSH index used to only compare tweets with candidate centroids
+            __bandKeys:
+                The LSH band keys of every tweet, computed once in fit
+            __lshRecall:
+                The fraction of tweets whose LSH assignment is as close as the exact one, for every iteration
+            __pruning:
+                If True the triangle inequality is used to skip the distances to centroids that cannot be the closest
+            __labels:
+                The int32 index of the centroid of every tweet, during fit the centroid of the last assignment
+            __minDistances:
+                The float32 distance of every tweet to its centroid
+            __changedClusters:
+                The clusters whose members changed in the last assignment, None when all of them must be updated
+            __lowerBounds:
+                A float64 (tweets, centroids) array with a lower bound of the distance of every tweet to every centroid
+            __upperBounds:
+                The float64 distance of every tweet to its centroid, exact after every assignment
+            __centroidMoves:
+                The distance every centroid moved in the last update
+            __relabel:
+                The new index of every centroid of the previous update
+            __skippedDistances:
+                The number of distance computations skipped by pruning in every iteration
             __centroids:
                 The centroids of the clusters formed
+            __centroidIndices:
+                The int32 indices of the centroids in the fitted tweets
             __previousCentroids:
                 The centroids of the clusters formed in the previous iteration
-            __clusters:
-                The clusters formed
-            __indicesTable:
-                A dictionary that keeps track of the indices of the tweets that have been assigned to a centroid
+            __initialization:
+                How the first centroids are chosen:
+                'random' picks clustersCount distinct random tweets,
+                'kmedoids++' picks every next centroid with a probability proportional to its squared jaccard distance
+                to the closest centroid already chosen,
+                'greedy' samples several kmedoids++ candidates for every centroid and keeps the one that
+                reduces the total squared distance the most
+            __random:
+                The random generator of the model, seeded by randomState so runs can be reproduced
+            __deduplicate:
+                If True the tweets with identical token sets are clustered once, weighted by their count
+            __weights:
+                The number of tweets every clustered entry stands for, all ones without deduplication
+            __inverse:
+                The clustered entry of every fitted tweet when deduplicating, None otherwise
+            __pool:
+                The pool of worker processes used during fit when jobsCount is above 1
+            __electedSizes:
+                The number of members of every cluster when its medoid was last elected
+            __addedCounts:
+                The number of members every cluster gained by partialFit since its medoid was last elected
             __iterationCount:
                 The number of iterations performed
             __sse:
                 The sum of squared errors of the clusters formed
+            __sseHistory:
+                The sum of squared errors of the assignment of every iteration
+            __onIteration:
+                The function receiving the progress of every iteration during fit
+            __cancelToken:
+                The object whose is_set method stops the fit, during fit
+            __startTime:
+                The time the last fit started, to report the elapsed time
 
 
         Example:
@@ -49,26 +209,101 @@ class KMeans:
              >>> clusters = kmeans.getClusters()
              >>> sse = kmeans.getSSE()
 
+             >>> corpus = Corpus.fromTweets(tweets)
+             >>> kmeans = KMeans(clustersCount=2, initialization='kmedoids++', randomState=42)
+             >>> kmeans.fit(corpus)
+
     '''
-    
-    def __init__(self, clustersCount=4, maxIterations=50):
+
+    __slots__ = (
+        '__clustersCount', '__maxIterations', '__tolerance', '__sseTolerance', '__distance', '__medoidUpdate',
+        '__medoidSamples', '__chunkSize', '__backend', '__lsh', '__bandKeys', '__lshRecall', '__pruning', '__labels',
+        '__minDistances', '__changedClusters', '__lowerBounds', '__upperBounds', '__centroidMoves', '__relabel', '__skippedDistances',
+        '__tweets', '__centroids', '__centroidIndices', '__previousCentroids', '__initialization', '__random',
+        '__deduplicate', '__weights', '__inverse', '__pool', '__electedSizes', '__addedCounts', '__iterationCount',
+        '__sse', '__sseHistory', '__onIteration', '__cancelToken', '__startTime',
+    )
+
+    def __init__(self, clustersCount=4, maxIterations=50, distance='sparse', lsh: Optional[MinHashLSH] = None,
+                 medoidUpdate='exact', medoidSamples=64, chunkSize=4_000_000, pruning=False,
+                 initialization='random', randomState=None, deduplicate=False, tolerance=None, sseTolerance=None):
+        if isinstance(distance, str) and distance not in BACKENDS:
+            raise ValueError(f'Unknown distance backend { distance }, expected one of { list(BACKENDS) }')
+        if not isinstance(distance, str) and deduplicate:
+            raise ValueError('A distance backend instance is bound to its tweets and cannot be deduplicated')
+        if medoidUpdate not in MEDOID_UPDATES:
+            raise ValueError(f'Unknown medoid update { medoidUpdate }, expected one of { MEDOID_UPDATES }')
+        if medoidUpdate == 'prototype' and distance == 'set':
+            raise ValueError('The prototype medoid update needs the sparse distance backend')
+        if initialization not in INITIALIZATIONS:
+            raise ValueError(f'Unknown initialization { initialization }, expected one of { INITIALIZATIONS }')
+        if pruning and lsh is not None:
+            raise ValueError('Pruning needs exact distances and cannot be combined with lsh')
         self.__clustersCount = clustersCount
         self.__maxIterations = maxIterations
+        self.__tolerance = tolerance
+        self.__sseTolerance = sseTolerance
+        self.__distance = distance
+        self.__medoidUpdate = medoidUpdate
+        self.__medoidSamples = medoidSamples
+        self.__chunkSize = chunkSize
+        self.__backend = None
+        self.__lsh = lsh
+        self.__bandKeys = None
+        self.__lshRecall = []
+        self.__pruning = pruning
+        self.__labels = None
+        self.__minDistances = None
+        self.__changedClusters = None
+        self.__lowerBounds = None
+        self.__upperBounds = None
+        self.__centroidMoves = None
+        self.__relabel = None
+        self.__skippedDistances = []
+        self.__tweets = []
         self.__centroids = []
+        self.__centroidIndices = numpy.empty(0, dtype=numpy.int32)
         self.__previousCentroids = []
-        self.__clusters = {}
-        self.__indicesTable = {}
+        self.__initialization = initialization
+        self.__random = random.Random(randomState)
+        self.__deduplicate = deduplicate
+        self.__weights = None
+        self.__inverse = None
+        self.__pool = None
+        self.__electedSizes = None
+        self.__addedCounts = None
         self.__iterationCount = 0
-        self.__sse = 0
-
-    def fit(self, tweets: List[List[str]]) -> None:
+        self.__sse = 0.0
+        self.__sseHistory = []
+        self.__onIteration = None
+        self.__cancelToken = None
+        self.__startTime = None
+
+    def fit(self, tweets: Union[List[List[str]], Corpus], jobsCount=1,
+            onIteration: Optional[Callable[[dict], None]] = None, cancelToken=None) -> None:
         '''
             This method takes a list of tweets as input and performs k-means clustering on it
 
             Parameters:
             -----------
                 tweets:
-                    A list of tweets represented as a list of lists of strings
+                    A list of tweets represented as a list of lists of strings,
+                    or a Corpus to skip encoding the tweets again
+
+                jobsCount:
+                    The number of worker processes computing the assignment and medoid distances,
+                    the encoded tweets are shared with them once through shared memory,
+                    the result is the same as with a single process
+
+                onIteration:
+                    An optional function called after every iteration with a dictionary of its progress:
+                    the 'iteration' number, the 'sse' of its assignment, the number of tweets whose cluster
+                    changed ('labelsChanged') and the seconds 'elapsed' since the fit started.
+                    The progress is printed when it is None
+
+                cancelToken:
+                    An optional object with an is_set method, like a threading.Event or a multiprocessing.Event,
+                    the fit raises FitCancelled soon after it is set, between iterations or between blocks of distances
 
             Returns:
             --------
@@ -81,22 +316,349 @@ class KMeans:
 
                 >>> kmeans = KMeans(clustersCount=2)
                 >>> kmeans.fit(tweets)
+
+                >>> cancelToken = threading.Event()
+                >>> kmeans.fit(tweets, onIteration=print, cancelToken=cancelToken)
+                {'iteration': 1, 'sse': 2.0, 'labelsChanged': 4, 'elapsed': 0.0004}
+                ...
+        '''
+        self.__onIteration = onIteration
+        self.__cancelToken = cancelToken
+        self.__startTime = time.perf_counter()
+        if self.__deduplicate:
+            # cluster every distinct token set once, weighted by the number of tweets sharing it
+            corpus = tweets if isinstance(tweets, Corpus) else Corpus.fromTweets(tweets)
+            self.__tweets, weights, self.__inverse = corpus.deduplicate()
+            self.__weights = weights.astype(numpy.float64)
+        else:
+            self.__tweets = tweets
+            self.__weights = numpy.ones(len(tweets))
+
+        # encode the tweets once for the selected distance backend, unless a backend was given
+        if isinstance(self.__distance, str):
+            self.__backend = BACKENDS[self.__distance](self.__tweets)
+        else:
+            self.__backend = self.__distance
+        if self.__lsh is not None:
+            corpus = self.__tweets if isinstance(self.__tweets, Corpus) else Corpus.fromTweets(self.__tweets)
+            self.__bandKeys = self.__lsh.bandKeys(self.__lsh.signatures(corpus))
+
+        if self.__clustersCount > len(self.__tweets):
+            raise ValueError(f'Cannot form { self.__clustersCount } clusters from { len(self.__tweets) } distinct tweets')
+
+        if jobsCount > 1:
+            if self.__distance == 'set':
+                raise ValueError('Parallel fit needs the sparse distance backend')
+            self.__pool = DistancePool(self.__backend.getCorpus(), jobsCount)
+        try:
+            self.__iterate()
+        finally:
+            if self.__pool is not None:
+                self.__pool.close()
+                self.__pool = None
+            self.__onIteration = None
+            self.__cancelToken = None
+            # the bounds are only needed during fit, they hold one value per tweet and per centroid
+            self.__lowerBounds = None
+            self.__upperBounds = None
+
+        if self.__deduplicate:
+            self.__expandDuplicates(tweets)
+
+        # the labels index the centroids before the last update, map them to the updated centroids
+        self.__labels = self.__relabel[self.__labels].astype(numpy.int32)
+        self.__electedSizes = numpy.bincount(self.__labels, minlength=len(self.__centroids))
+        self.__sse = self.__assignmentSSE()
+        self.__addedCounts = numpy.zeros(len(self.__centroids), dtype=numpy.int64)
+
+    def predict(self, tweets: Iterable[List[str]]) -> numpy.ndarray:
+        '''
+            This method finds the closest centroid of every tweet, without changing the model
+
+            Parameters:
+            -----------
+                tweets:
+                    The tweets represented as lists of strings
+
+            Returns:
+            --------
+                The index of the closest centroid of every tweet
+
+            Example:
+            --------
+                >>> kmeans = KMeans(clustersCount=2)
+                >>> kmeans.fit(tweets)
+                >>> kmeans.predict([['a', 'b'], ['k', 'l']])
+                array([0, 1])
         '''
-        # initialization, assign random tweets as centroids
+        # the ties are broken by a generator of their own, so predicting does not change the model
+        labels, _ = self.__closestCentroids(list(tweets), random.Random(0))
+        return labels
 
-        for _ in range(self.__clustersCount):
-            randomIndex = random.randint(0, len(tweets) - 1)
-            if self.__indicesTable.get(randomIndex) is None:
-                self.__indicesTable[randomIndex] = True
-                self.__centroids.append(tweets[randomIndex])
+    def partialFit(self, tweets: Iterable[List[str]], driftThreshold=0.1) -> List[int]:
+        '''
+            This method adds new tweets to the fitted model without fitting it again
+            Every tweet joins the cluster of its closest centroid, then only the clusters that gained more than
+            driftThreshold of their members since their medoid was elected elect their medoid again
+            Tweets of other clusters are not moved, fit again from time to time to rebalance the clusters
+
+            Parameters:
+            -----------
+                tweets:
+                    The new tweets represented as lists of strings
 
-        # run the iterations until not converged or until the max iteration in not reached
-        while not self.__isConverged() and self.__iterationCount < self.__maxIterations:
+                driftThreshold:
+                    The fraction of new members above which a cluster elects its medoid again
 
-            print("running iteration " + str(self.__iterationCount + 1))
+            Returns:
+            --------
+                The indices of the clusters whose medoid was elected again
+
+            Example:
+            --------
+                >>> kmeans = KMeans(clustersCount=5)
+                >>> kmeans.fit(tweets)
+                >>> kmeans.partialFit(newTweets)
+                [2]
+        '''
+        if not isinstance(self.__distance, str):
+            raise ValueError('A distance backend instance is bound to its tweets, partialFit needs a backend name')
+
+        tweets = [list(tweet) for tweet in tweets]
+        labels, distances = self.__closestCentroids(tweets, self.__random)
+
+        corpus = self.__getCorpus().append(tweets)
+        self.__tweets = corpus if isinstance(self.__tweets, Corpus) else self.__tweets + tweets
+        self.__backend = BACKENDS[self.__distance](corpus if self.__distance == 'sparse' else self.__tweets)
+        self.__weights = numpy.ones(len(self.__tweets))
+        self.__inverse = None
+
+        self.__labels = numpy.concatenate((self.__labels, labels.astype(numpy.int32)))
+        self.__minDistances = numpy.concatenate((self.__minDistances, distances.astype(numpy.float32)))
+        self.__addedCounts += numpy.bincount(labels, minlength=len(self.__centroids))
+
+        drifted = numpy.flatnonzero(self.__getDrift() > driftThreshold).tolist()
+        members = self.__clusterMembers()
+        for cluster in drifted:
+            clusterMembers = members[cluster]
+            closestTweet = self.__electMedoid(clusterMembers, self.__centroidIndices[cluster])
+            self.__centroidIndices[cluster] = clusterMembers[closestTweet]
+            self.__centroids[cluster] = self.__tweets[clusterMembers[closestTweet]]
+
+            # the members keep their cluster, only their distance to the new medoid changes
+            self.__minDistances[clusterMembers] = self.__backend.pairDistances(
+                clusterMembers, [clusterMembers[closestTweet]] * len(clusterMembers)
+            )
+            self.__electedSizes[cluster] = len(clusterMembers)
+            self.__addedCounts[cluster] = 0
+
+        self.__sse = self.__assignmentSSE()
+        return drifted
+
+    def save(self, directory: str) -> None:
+        '''
+            This method saves the fitted model in a directory
+            The encoded tweets (token ids and offsets), the vocabulary, the centroid indices, the cluster
+            and the distance of every tweet are written as flat binary arrays that load can memory map,
+            so the model can be reopened and queried without encoding the tweets or fitting again
+
+            Parameters:
+            -----------
+                directory:
+                    The directory to save in, it is created if needed
+
+            Returns:
+            --------
+                None
+
+            Example:
+            --------
+                >>> kmeans.fit(tweets)
+                >>> kmeans.save('models/bbchealth')
+                >>> kmeans = KMeans.load('models/bbchealth')
+                >>> kmeans.predict([['ebola', 'outbreak']])
+                array([3])
+
+                >>> # a loaded model can be saved back over its own memory mapped files
+                >>> kmeans.partialFit([['ebola', 'vaccine']])
+                >>> kmeans.save('models/bbchealth')
+        '''
+        corpus = self.__getCorpus()
+        writeMetadata(directory, {
+            'corpus': corpus.writeArrays(directory),
+            'model': {
+                'clustersCount': self.__clustersCount,
+                'maxIterations': self.__maxIterations,
+                'tolerance': self.__tolerance,
+                'sseTolerance': self.__sseTolerance,
+                'distance': self.__distance if self.__distance == 'set' else 'sparse',
+                'medoidUpdate': self.__medoidUpdate,
+                'medoidSamples': self.__medoidSamples,
+                'chunkSize': self.__chunkSize,
+                'pruning': self.__pruning,
+                'initialization': self.__initialization,
+                'iterationCount': self.__iterationCount,
+                'sse': self.__sse,
+                'sseHistory': self.__sseHistory,
+            },
+            'arrays': {
+                'centroidIndices': writeArray(directory, 'centroidIndices', self.__centroidIndices),
+                'labels': writeArray(directory, 'labels', self.__labels),
+                'distances': writeArray(directory, 'distances', self.__minDistances),
+                'electedSizes': writeArray(directory, 'electedSizes', self.__electedSizes.astype(numpy.int64)),
+                'addedCounts': writeArray(directory, 'addedCounts', self.__addedCounts.astype(numpy.int64)),
+            },
+        })
+
+    @staticmethod
+    def load(directory: str, mmap=True) -> 'KMeans':
+        '''
+            This method reopens a model saved by save
+            The tweets of the loaded model are a Corpus, so they are the distinct tokens of every tweet
+
+            Parameters:
+            -----------
+                directory:
+                    The directory the model was saved in
+
+                mmap:
+                    If True the arrays are memory mapped instead of being loaded in memory
+
+            Returns:
+            --------
+                The fitted model
+        '''
+        metadata = readMetadata(directory)
+        settings, arrays = metadata['model'], metadata['arrays']
+        model = KMeans(
+            settings['clustersCount'], settings['maxIterations'], distance=settings['distance'],
+            medoidUpdate=settings['medoidUpdate'], medoidSamples=settings['medoidSamples'],
+            chunkSize=settings['chunkSize'], pruning=settings['pruning'], initialization=settings['initialization'],
+            tolerance=settings['tolerance'], sseTolerance=settings['sseTolerance'],
+        )
+        corpus = Corpus.readArrays(directory, metadata['corpus'], mmap)
+        model.__tweets = corpus
+        model.__weights = numpy.ones(len(corpus))
+        model.__backend = BACKENDS[model.__distance](corpus)
+        model.__centroidIndices = readArray(directory, 'centroidIndices', arrays['centroidIndices'], mmap=False)
+        model.__centroids = [corpus[index] for index in model.__centroidIndices]
+        model.__previousCentroids = model.__centroids.copy()
+        model.__electedSizes = readArray(directory, 'electedSizes', arrays['electedSizes'], mmap=False)
+        model.__addedCounts = readArray(directory, 'addedCounts', arrays['addedCounts'], mmap=False)
+        model.__labels = readArray(directory, 'labels', arrays['labels'], mmap)
+        model.__minDistances = readArray(directory, 'distances', arrays['distances'], mmap)
+        model.__iterationCount = settings['iterationCount']
+        model.__sse = settings['sse']
+        model.__sseHistory = settings['sseHistory']
+        return model
+
+    def __clusterMembers(self) -> Dict[int, List[int]]:
+        '''
+            This method groups the tweets by their label with one stable sort
+
+            Parameters:
+            -----------
+                None
+
+            Returns:
+            --------
+                A dictionary mapping every non empty cluster to the increasing indices of its tweets,
+                ordered by the first tweet of every cluster
+        '''
+        order = numpy.argsort(self.__labels, kind='stable')
+        bounds = numpy.concatenate(([0], numpy.bincount(self.__labels).cumsum()))
+        _, firstTweets = numpy.unique(self.__labels, return_index=True)
+        clusters = self.__labels[numpy.sort(firstTweets)].tolist()
+        return {cluster: order[bounds[cluster]:bounds[cluster + 1]].tolist() for cluster in clusters}
+
+    def __getDrift(self) -> numpy.ndarray:
+        return self.__addedCounts / numpy.maximum(self.__electedSizes, 1)
+
+    def __getCorpus(self) -> Corpus:
+        '''
+            This method returns the fitted tweets as a Corpus, encoding them if needed
+
+            Parameters:
+            -----------
+                None
+
+            Returns:
+            --------
+                The corpus of the fitted tweets
+        '''
+        if isinstance(self.__tweets, Corpus):
+            return self.__tweets
+        if isinstance(self.__backend, SparseJaccard) and len(self.__backend) == len(self.__tweets):
+            return self.__backend.getCorpus()
+        return Corpus.fromTweets(self.__tweets)
+
+    def __closestCentroids(self, tweets: List[List[str]], generator: random.Random):
+        '''
+            This method finds the closest centroid of tweets that were not fitted
+            The new tweets are looked up in the vocabulary of the fitted tweets without adding their new tokens,
+            which only count in the union of the distance, and stacked after the centroids
+
+            Parameters:
+            -----------
+                tweets:
+                    The tweets represented as lists of strings
+
+                generator:
+                    The random generator choosing the cluster of the tweets sharing no token with any centroid
+
+            Returns:
+            --------
+                A tuple of (labels, distances) arrays
+        '''
+        corpus = self.__getCorpus()
+        unknownIds = {}
+        rows = [corpus.vocabulary.lookup(tweet, unknownIds) for tweet in tweets]
+        centroidRows = [corpus.ids(index) for index in self.__centroidIndices]
+        backend = SparseJaccard(Corpus.fromRows(corpus.vocabulary, centroidRows + rows),
+                                vocabularySize=len(corpus.vocabulary) + len(unknownIds))
+
+        distances = backend.distances(range(len(centroidRows), len(centroidRows) + len(rows)), range(len(centroidRows)))
+        labels = distances.argmin(axis=1)
+        minDistances = distances[range(len(rows)), labels]
+        for index in numpy.flatnonzero(minDistances == 1):
+            labels[index] = generator.randint(0, len(centroidRows) - 1)
+        return labels, minDistances
+
+    def __iterate(self) -> None:
+        '''
+            This method chooses the first centroids then runs the assignment and update steps
+
+            Parameters:
+            -----------
+                None
+
+            Returns:
+            --------
+                None
+        '''
+        # initialization, choose clustersCount distinct tweets as centroids
+        if self.__initialization == 'random':
+            self.__centroidIndices = self.__randomCentroids()
+        else:
+            self.__centroidIndices = self.__seedCentroids(trials=1 if self.__initialization == 'kmedoids++' else None)
+        self.__centroidIndices = numpy.asarray(self.__centroidIndices, dtype=numpy.int32)
+        self.__centroids = [self.__tweets[index] for index in self.__centroidIndices]
+        self.__labels = None
+        self.__relabel = None
+        self.__lowerBounds = None
+        self.__upperBounds = None
+        self.__iterationCount = 0
+        self.__sseHistory = []
+
+        # run the iterations until converged or until the max iteration is reached
+        converged = False
+        while not converged and self.__iterationCount < self.__maxIterations:
+            self.__checkCancelled()
+            if self.__onIteration is None:
+                print("running iteration " + str(self.__iterationCount + 1))
 
             # assignment, assign tweets to the closest centroids
-            self.__assignCluster(tweets)
+            changedFraction, changedCount = self.__assignCluster()
 
             # to check if k-means converges, keep track of previousCentroids
             self.__previousCentroids = self.__centroids.copy()
@@ -105,10 +667,145 @@ class KMeans:
             self.__updateCentroids()
             self.__iterationCount += 1
 
-        if (self.__iterationCount == self.__maxIterations):
-            print("max iterations reached, K means not converged")
+            converged = self.__isConverged() or self.__isWithinTolerance(changedFraction)
+            if self.__onIteration is not None:
+                self.__onIteration({
+                    'iteration': self.__iterationCount,
+                    'sse': self.__sseHistory[-1],
+                    'labelsChanged': changedCount,
+                    'elapsed': time.perf_counter() - self.__startTime,
+                })
+
+        if self.__onIteration is not None:
+            return
+        if converged:
+            print("converged after " + str(self.__iterationCount) + " iterations")
         else:
-            print("converged")
+            print("max iterations reached, K means not converged")
+
+    def __checkCancelled(self) -> None:
+        if self.__cancelToken is not None and self.__cancelToken.is_set():
+            raise FitCancelled(f'The fit of { self.__clustersCount } clusters was cancelled')
+
+    def __distances(self, rows, columns) -> numpy.ndarray:
+        '''
+            This method computes a block of distances, in the worker processes when the block is large enough
+
+            Parameters:
+            -----------
+                rows:
+                    The indices of the row tweets
+
+                columns:
+                    The indices of the column tweets
+
+            Returns:
+            --------
+                A float64 array of shape (len(rows), len(columns))
+        '''
+        if self.__pool is not None and len(rows) * len(columns) >= PARALLEL_MINIMUM_BLOCK:
+            return self.__pool.distances(rows, columns)
+        return self.__backend.distances(rows, columns)
+
+    def __expandDuplicates(self, tweets: Union[List[List[str]], Corpus]) -> None:
+        '''
+            This method expands the clusters of the distinct token sets back to the fitted tweets
+            Every tweet gets the cluster and the distance of its token set, and every centroid
+            becomes the first tweet having its token set
+
+            Parameters:
+            -----------
+                tweets:
+                    The tweets given to fit
+
+            Returns:
+            --------
+                None
+        '''
+        firstTweets = numpy.full(len(self.__tweets), len(tweets))
+        numpy.minimum.at(firstTweets, self.__inverse, numpy.arange(len(tweets)))
+
+        self.__labels = self.__labels[self.__inverse]
+        self.__minDistances = self.__minDistances[self.__inverse]
+        self.__centroidIndices = firstTweets[self.__centroidIndices].astype(numpy.int32)
+        self.__centroids = [tweets[index] for index in self.__centroidIndices]
+        self.__tweets = tweets
+        self.__weights = numpy.ones(len(tweets))
+        self.__inverse = None
+        # the backend indexes the distinct token sets, not the expanded tweets
+        self.__backend = BACKENDS[self.__distance](self.__getCorpus() if self.__distance == 'sparse' else tweets)
+
+    def __randomCentroids(self) -> List[int]:
+        '''
+            This method picks clustersCount distinct random tweets
+            When deduplicating, tweets are drawn uniformly and mapped to their entry until clustersCount
+            distinct entries are found, so frequent token sets are as likely as without deduplication
+
+            Parameters:
+            -----------
+                None
+
+            Returns:
+            --------
+                The indices of the centroids
+        '''
+        if self.__inverse is None:
+            return self.__random.sample(range(len(self.__tweets)), self.__clustersCount)
+
+        centroids = {}
+        for index in self.__random.sample(range(len(self.__inverse)), len(self.__inverse)):
+            centroids.setdefault(int(self.__inverse[index]), None)
+            if len(centroids) == self.__clustersCount:
+                break
+        return list(centroids)
+
+    def __seedCentroids(self, trials: Optional[int] = None) -> List[int]:
+        '''
+            This method chooses the first centroids with D² weighting (k-medoids++)
+            Every next centroid is drawn with a probability proportional to the squared distance of the tweet
+            to its closest centroid already chosen, so the centroids are spread over the tweets
+
+            Parameters:
+            -----------
+                trials:
+                    The number of candidates drawn for every centroid, the candidate that reduces the total
+                    squared distance the most is kept, defaults to 2 + log(clustersCount) like greedy k-means++
+
+            Returns:
+            --------
+                The indices of clustersCount distinct tweets
+        '''
+        if trials is None:
+            trials = 2 + int(math.log(self.__clustersCount))
+        tweetsRange = range(len(self.__tweets))
+
+        centroids = [self.__random.randrange(len(self.__tweets))]
+        closestDistances = self.__distances(tweetsRange, centroids)[:, 0] ** 2
+        while len(centroids) < self.__clustersCount:
+            weights = closestDistances * self.__weights
+            weights[centroids] = 0
+            if weights.sum() == 0:
+                # the remaining tweets are all identical to a centroid, fall back to uniform weights
+                weights = numpy.ones(len(self.__tweets))
+                weights[centroids] = 0
+
+            cumulativeWeights = weights.cumsum()
+            candidates = [
+                int(numpy.searchsorted(cumulativeWeights, self.__random.random() * cumulativeWeights[-1], side='right'))
+                for _ in range(trials)
+            ]
+            candidates = [min(candidate, len(cumulativeWeights) - 1) for candidate in candidates]
+            candidates = [candidate for candidate in dict.fromkeys(candidates) if weights[candidate] > 0]
+            if not candidates:
+                continue
+
+            candidateDistances = numpy.minimum(
+                closestDistances[:, None], self.__distances(tweetsRange, candidates) ** 2
+            )
+            best = int((candidateDistances * self.__weights[:, None]).sum(axis=0).argmin())
+            centroids.append(candidates[best])
+            closestDistances = candidateDistances[:, best]
+        return centroids
 
     def __isConverged(self) -> bool:
         '''
@@ -135,6 +832,10 @@ class KMeans:
         if len(self.__previousCentroids) != len(self.__centroids):
             return False
 
+        if self.__changedClusters is not None and not self.__changedClusters:
+            # no tweet changed cluster, so no medoid was elected again
+            return True
+
         for current, previous in zip(self.__centroids, self.__previousCentroids):
             if current != previous:
                 return False
@@ -142,48 +843,172 @@ class KMeans:
         return True
 
 
-    def __assignCluster(self, tweets: List[List[str]]):
+    def __isWithinTolerance(self, changedFraction: float) -> bool:
+        '''
+            This method checks the early stopping tolerances of the last iteration
+
+            Parameters:
+            -----------
+                changedFraction:
+                    The fraction of the tweets sharing a token with their centroid that changed cluster
+
+            Returns:
+            --------
+                True if the labels or the SSE changed less than their tolerance, False otherwise
+        '''
+        if self.__iterationCount < 2:
+            # the first assignment is compared with the random seeds, not with an election
+            return False
+        if self.__tolerance is not None and changedFraction <= self.__tolerance:
+            return True
+        if self.__sseTolerance is not None:
+            previousSSE, sse = self.__sseHistory[-2:]
+            return previousSSE - sse <= self.__sseTolerance * previousSSE
+        return False
+
+    def __assignCluster(self) -> Tuple[float, int]:
         '''
             This method assigns tweets to the closest centroids
+            The distances of all tweets to all centroids are computed as one block by the backend
+            The labels are compared with the previous ones to find the clusters whose members changed,
+            and the SSE of the assignment is added to the history
 
             Parameters:
             -----------
-                tweets:
-                    A list of tweets represented as a list of lists of strings
+                None
 
             Returns:
             --------
+                The fraction of the tweets sharing a token with their centroid that changed cluster,
+                tweets sharing no token with any centroid get a random cluster every time so they are not counted,
+                and the number of tweets that changed cluster, all of them in the first assignment
+        '''
+        if self.__pruning and self.__lowerBounds is not None:
+            closestCentroids, minDistances = self.__boundedClosestCentroids()
+        else:
+            if self.__lsh is None:
+                distances = self.__distances(range(len(self.__tweets)), self.__centroidIndices)
+            else:
+                distances = self.__candidateDistances()
+            # the first closest centroid wins, like a strict comparison over the centroids in order
+            closestCentroids = distances.argmin(axis=1)
+            minDistances = distances[range(len(self.__tweets)), closestCentroids]
+            if self.__pruning:
+                # the first assignment computes every distance, they are the first bounds
+                self.__lowerBounds = numpy.array(distances, dtype=numpy.float64)
+                self.__upperBounds = numpy.array(minDistances, dtype=numpy.float64)
+                self.__skippedDistances.append(0)
+
+        labels = numpy.asarray(closestCentroids, dtype=numpy.int32).copy()
+        for index in numpy.flatnonzero(minDistances == 1):
+            labels[index] = self.__random.randint(0, len(self.__centroids) - 1)
+
+        changedFraction = 1.0
+        changedCount = len(labels)
+        self.__changedClusters = None
+        if self.__labels is not None:
+            # the previous labels index the centroids before the update, which may have dropped empty clusters
+            previousLabels = self.__relabel[self.__labels]
+            changed = labels != previousLabels
+            self.__changedClusters = set(labels[changed].tolist()) | set(previousLabels[changed].tolist())
+            counted = minDistances < 1
+            changedFraction = float((changed & counted).sum() / max(counted.sum(), 1))
+            changedCount = int(changed.sum())
+        self.__labels = labels
+        self.__minDistances = numpy.asarray(minDistances, dtype=numpy.float32)
+        self.__sseHistory.append(self.__assignmentSSE())
+        return changedFraction, changedCount
+
+    def __boundedClosestCentroids(self):
+        '''
+            This method finds the closest centroids while skipping the distances that cannot change the assignment,
+            with one lower bound per tweet and per centroid like Elkan's k-means
+            The bound of a tweet x to a centroid c decreases by the move of c at every update, and the distance u
+            from x to its centroid a grows by at most the move of a. The distance d(x, c) is only computed when
+            u is not below the bound of c, and not below half of d(a, c), as the triangle inequality gives
+            d(x, c) >= d(a, c) - u. Both tests are strict, so a skipped centroid is strictly farther than a and the
+            assignment is the same as comparing every tweet with every centroid.
+            The distance to the centroid is only computed again for the tweets whose centroid moved,
+            so the distances and the SSE stay exact
+
+            Parameters:
+            -----------
                 None
+
+            Returns:
+            --------
+                A tuple of (closestCentroids, minDistances) arrays
+        '''
+        centroids = numpy.asarray(self.__centroidIndices)
+        labels = self.__relabel[self.__labels].astype(numpy.int64)
+        lowerBounds, upperBounds = self.__lowerBounds, self.__upperBounds
+        tweetsCount = len(labels)
+
+        moved = numpy.flatnonzero(self.__centroidMoves[labels] > 0)
+        if len(moved) > 0:
+            upperBounds[moved] = self.__backend.pairDistances(moved, centroids[labels[moved]])
+        lowerBounds[numpy.arange(tweetsCount), labels] = upperBounds
+        computedCount = len(moved)
+
+        halfDistances = self.__backend.distances(centroids, centroids) / 2
+        numpy.fill_diagonal(halfDistances, numpy.inf)
+        # the tweets closer to their centroid than half the distance to the nearest other centroid keep it
+        active = numpy.flatnonzero(upperBounds + BOUND_EPSILON >= halfDistances.min(axis=1)[labels])
+
+        for centroid in range(len(centroids)):
+            rows = active[
+                (upperBounds[active] + BOUND_EPSILON >= lowerBounds[active, centroid])
+                & (upperBounds[active] + BOUND_EPSILON >= halfDistances[labels[active], centroid])
+            ]
+            if len(rows) == 0:
+                continue
+            distances = self.__distances(rows, centroids[centroid:centroid + 1])[:, 0]
+            computedCount += len(rows)
+            lowerBounds[rows, centroid] = distances
+            # the first closest centroid wins, like argmin over the centroids in order
+            closer = (distances < upperBounds[rows]) | ((distances == upperBounds[rows]) & (centroid < labels[rows]))
+            labels[rows[closer]] = centroid
+            upperBounds[rows[closer]] = distances[closer]
+
+        self.__skippedDistances.append(tweetsCount * len(centroids) - computedCount)
+        return labels, upperBounds.copy()
+
+    def __candidateDistances(self) -> numpy.ndarray:
         '''
-        self.__clusters = {}
-        # for every tweet iterate each centroid and assign closest centroid to a it
-        for tweet in tweets:
-            minDistance = float('inf')
-            closestCentroid = None
+            This method computes the distances of the tweets to their LSH candidate centroids only
+            Tweets without any candidate are compared with every centroid
 
-            for index, centroid in enumerate(self.__centroids):
-                if centroid == tweet:
-                    closestCentroid = index
-                    minDistance = 0
-                    break
+            Parameters:
+            -----------
+                None
+
+            Returns:
+            --------
+                A float64 array of shape (len(tweets), len(centroids)), inf where the distance was skipped
+        '''
+        candidates = self.__lsh.candidates(self.__bandKeys, self.__bandKeys[self.__centroidIndices])
+        fullScan = ~candidates.any(axis=1)
 
-                distance = self.__getDistance(centroid, tweet)
-                if distance < minDistance:
-                    minDistance = distance
-                    closestCentroid = index
+        distances = numpy.full(candidates.shape, numpy.inf)
+        rows = numpy.flatnonzero(fullScan)
+        if len(rows) > 0:
+            distances[rows] = self.__distances(rows, self.__centroidIndices)
 
-            if minDistance == 1:
-                closestCentroid = random.randint(0, len(self.__centroids) - 1)
+        rows, columns = numpy.nonzero(candidates)
+        if len(rows) > 0:
+            centroids = numpy.asarray(self.__centroidIndices)[columns]
+            distances[rows, columns] = self.__backend.pairDistances(rows, centroids)
 
-            if self.__clusters.get(closestCentroid) is None:
-                self.__clusters[closestCentroid] = []
-            self.__clusters[closestCentroid].append([tweet])
-            lastTweetIndex = len(self.__clusters[closestCentroid]) - 1
-            self.__clusters[closestCentroid][lastTweetIndex].append(minDistance)
+        if self.__lsh.measureRecall:
+            exact = self.__distances(range(len(self.__tweets)), self.__centroidIndices)
+            self.__lshRecall.append(float(numpy.mean(distances.min(axis=1) == exact.min(axis=1))))
+        return distances
 
     def __updateCentroids(self):
         '''
             This method updates the centroids based on the clusters formed
+            The medoid of every cluster is the member with the minimum sum of distances to the other members,
+            every member counting as many times as its weight
 
             Parameters:
             -----------
@@ -193,68 +1018,119 @@ class KMeans:
             --------
                 None
         '''
-        self.__centroids = []
-        for cluster in self.__clusters.keys():
-            minDistanceSum = float('inf')
-            closestTweet = -1
-
-            distanceMemory = []
-
-            for index, tweet in enumerate(self.__clusters[cluster]):
-                distanceMemory.append([])
-                distanceSum = 0
-                for otherIndex, otherTweet in enumerate(self.__clusters[cluster]):
-                    if index != otherIndex:
-
-                        if otherIndex < index:
-                            distance = distanceMemory[otherIndex][index]
-                        else:
-                            distance = self.__getDistance(tweet[0], otherTweet[0])
-                    else:
-                        distance = 0
-
-                    distanceMemory[index].append(distance)
-                    distanceSum += distance
-
+        previousCentroidIndices = self.__centroidIndices
+        clusters = self.__clusterMembers()
+        centroidIndices = []
+        self.__relabel = numpy.full(len(previousCentroidIndices), -1)
+        for cluster, members in clusters.items():
+            self.__checkCancelled()
+            if self.__changedClusters is not None and cluster not in self.__changedClusters:
+                # same members as when its medoid was elected, the election would give the same medoid
+                centroidIndices.append(int(previousCentroidIndices[cluster]))
+            else:
+                closestTweet = self.__electMedoid(members, previousCentroidIndices[cluster])
+                centroidIndices.append(members[closestTweet])
+            self.__relabel[cluster] = len(centroidIndices) - 1
+        self.__centroidIndices = numpy.asarray(centroidIndices, dtype=numpy.int32)
+        self.__centroids = [self.__tweets[index] for index in self.__centroidIndices]
+
+        if self.__pruning:
+            previousCentroids = previousCentroidIndices[list(clusters)]
+            self.__centroidMoves = self.__backend.pairDistances(previousCentroids, self.__centroidIndices)
+            # the bounds follow the kept centroids, each one decreases by the move of its centroid
+            self.__lowerBounds = self.__lowerBounds[:, list(clusters)] - self.__centroidMoves
+
+    def __electMedoid(self, members: List[int], previousCentroid: int) -> int:
+        if self.__medoidUpdate == 'prototype':
+            return self.__prototypeMedoid(members)
+        if self.__medoidUpdate == 'sampled' and len(members) > self.__medoidSamples:
+            return self.__sampledMedoid(members, previousCentroid)
+        return self.__exactMedoid(members, range(len(members)))
+
+    def __exactMedoid(self, members: List[int], candidates) -> int:
+        '''
+            This method finds the candidate with the minimum sum of distances to all the members
+            The distances are computed in blocks of columns so at most chunkSize distances are in memory
 
-                if distanceSum < minDistanceSum:
-                    minDistanceSum = distanceSum
-                    closestTweet = index
+            Parameters:
+            -----------
+                members:
+                    The indices of the tweets of the cluster
 
-            self.__centroids.append(self.__clusters[cluster][closestTweet][0])
+                candidates:
+                    The positions inside members of the candidate medoids
 
-    def __getDistance(self, tweet1: list[List[str]], tweet2: list[List[str]]) -> float:
+            Returns:
+            --------
+                The position inside members of the medoid
+        '''
+        candidates = list(candidates)
+        columnsPerChunk = max(1, self.__chunkSize // len(members))
+        weights = self.__weights[members] if self.__inverse is not None else None
+        distanceSums = numpy.empty(len(candidates), dtype=numpy.float64)
+        for start in range(0, len(candidates), columnsPerChunk):
+            self.__checkCancelled()
+            columns = [members[position] for position in candidates[start:start + columnsPerChunk]]
+            # the distance is symmetric, so the sum of a candidate is the sum of its column,
+            # accumulated top to bottom so the sums match a sequential python sum
+            if self.__pool is not None and len(members) * len(columns) >= PARALLEL_MINIMUM_BLOCK:
+                distanceSums[start:start + len(columns)] = self.__pool.columnSums(members, columns, weights)
+                continue
+
+            distances = self.__backend.distances(members, columns)
+            if weights is not None:
+                distances *= weights[:, None]
+            distanceSums[start:start + len(columns)] = distances.cumsum(axis=0)[-1]
+        return candidates[int(distanceSums.argmin())]
+
+    def __sampledMedoid(self, members: List[int], previousCentroid: int) -> int:
         '''
-            This method calculates the distance between two tweets
+            This method evaluates only a random sample of the members, plus the current medoid, as candidates
 
             Parameters:
             -----------
-                tweet1:
-                    A list of strings representing a tweet
+                members:
+                    The indices of the tweets of the cluster
 
-                tweet2:
-                    A list of strings representing a tweet
+                previousCentroid:
+                    The index of the medoid the members were assigned to
 
             Returns:
             --------
-                The distance between the two tweets
+                The position inside members of the medoid
+        '''
+        candidates = self.__random.sample(range(len(members)), self.__medoidSamples)
+        if previousCentroid in members:
+            candidates.append(members.index(previousCentroid))
+        return self.__exactMedoid(members, sorted(set(candidates)))
 
-            Example:
-            --------
+    def __prototypeMedoid(self, members: List[int]) -> int:
+        '''
+            This method builds the prototype of the cluster from its most frequent tokens,
+            as many as the median number of tokens of the members, then elects the member closest to it
 
-                >>> tweets = [['a', 'b', 'c'], ['d', 'e', 'f'], ['g', 'h', 'i'], ['j', 'k', 'l']]
+            Parameters:
+            -----------
+                members:
+                    The indices of the tweets of the cluster
 
-                >>> kmeans = KMeans(clustersCount=2)
-                >>> kmeans.fit(tweets)
-                >>> kmeans.__getDistance(tweets[0], tweets[1])
-                1.0
+            Returns:
+            --------
+                The position inside members of the medoid
         '''
-        # return the jaccard distance
-        return 1 - (len(set(tweet1).intersection(tweet2)) / len(set().union(tweet1, tweet2)))
-
-    def getSSE(self):
+        corpus = self.__backend.getCorpus()
+        weights = self.__weights[members]
+        lengths = corpus.lengths()[members]
+        tokens = numpy.concatenate([corpus.ids(member) for member in members])
+        counts = numpy.bincount(tokens, weights=numpy.repeat(weights, lengths), minlength=len(corpus.vocabulary))
+        prototypeLength = int(numpy.median(numpy.repeat(lengths, weights.astype(numpy.int64))))
+        prototype = numpy.argsort(-counts, kind='stable')[:prototypeLength]
+        prototype = prototype[counts[prototype] > 0]
+        return int(self.__backend.tokenDistances(members, prototype).argmin())
+
+    def getSSE(self) -> float:
         '''
-            This method calculates the sum of squared errors
+            This method returns the sum of squared errors, computed from the distances of the last assignment
 
             Parameters:
             -----------
@@ -274,17 +1150,53 @@ class KMeans:
                 >>> kmeans.getSSE()
                 0.0
         '''
-        if self.__sse == 0:
-            self.__calculateSSE()
         return self.__sse
 
-    def __calculateSSE(self):
-        for cluster in self.__clusters.keys():
-            for tweet in self.__clusters[cluster]:
-                self.__sse += tweet[1] ** 2
+    def getSSEHistory(self) -> List[float]:
+        return self.__sseHistory
+
+    def getClusterSSE(self) -> numpy.ndarray:
+        '''
+            This method returns the sum of squared errors of every cluster
+
+            Parameters:
+            -----------
+                None
+
+            Returns:
+            --------
+                A float64 array with the sum of the squared distances of the members of every cluster to its centroid
+        '''
+        squaredDistances = self.__weights * self.__minDistances.astype(numpy.float64) ** 2
+        return numpy.bincount(self.__labels, weights=squaredDistances, minlength=len(self.__centroids))
+
+    def __assignmentSSE(self) -> float:
+        # squared in float64 so the float32 distances do not lose precision in the sum
+        return float((self.__weights * self.__minDistances.astype(numpy.float64) ** 2).sum())
+
+    def getLSHRecall(self) -> List[float]:
+        return self.__lshRecall
+
+    def getSkippedDistances(self) -> List[int]:
+        return self.__skippedDistances
+
+    def getDrift(self) -> numpy.ndarray:
+        return self.__getDrift()
+
+    def getIterationCount(self) -> int:
+        return self.__iterationCount
 
     def getCentroids(self):
         return self.__centroids
 
-    def getClusters(self):
-        return self.__clusters
+    def getClusters(self) -> ClustersView:
+        return ClustersView(self.__tweets, self.__labels, self.__minDistances, len(self.__centroids))
+
+    def getLabels(self) -> numpy.ndarray:
+        return self.__labels
+
+    def getDistances(self) -> numpy.ndarray:
+        return self.__minDistances
+
+    def getCentroidIndices(self) -> numpy.ndarray:
+        return self.__centroidIndices
@@ -0,0 +1,178 @@
+import random
+from typing import Dict, Optional, Sequence
+
+import numpy
+
+METRICS = ('silhouette', 'sampledSilhouette', 'daviesBouldin', 'statistics')
+
+
+def silhouetteSamples(backend, labels: numpy.ndarray, samples: Sequence[int], chunkSize=4_000_000) -> numpy.ndarray:
+    '''
+        This function computes the silhouette of some tweets against all the clustered tweets
+        The silhouette of a tweet is (b - a) / max(a, b), where a is its mean distance to the other members
+        of its cluster and b its mean distance to the members of the closest other cluster
+        The distances are computed in blocks of columns, one column per sample, so at most chunkSize
+        distances are in memory, and the rows are sorted by cluster so the sums of every cluster are one reduceat
+
+        Parameters:
+        -----------
+            backend:
+                The distance backend built over the clustered tweets, like a SparseJaccard or a DistanceCache
+
+            labels:
+                The cluster of every tweet
+
+            samples:
+                The indices of the tweets whose silhouette is computed
+
+            chunkSize:
+                The maximum number of distances held in memory at once
+
+        Returns:
+        --------
+            A float64 array with the silhouette of every sample, 0 for the members of a cluster of one tweet
+    '''
+    labels = numpy.asarray(labels)
+    sizes = numpy.bincount(labels)
+    clusters = numpy.flatnonzero(sizes)
+    if len(clusters) < 2:
+        raise ValueError('The silhouette needs at least 2 non empty clusters')
+
+    order = numpy.argsort(labels, kind='stable')
+    starts = numpy.concatenate(([0], sizes.cumsum()))[clusters]
+    samples = numpy.asarray(samples, dtype=numpy.int64)
+    silhouettes = numpy.empty(len(samples), dtype=numpy.float64)
+    columnsPerChunk = max(1, chunkSize // len(labels))
+    for start in range(0, len(samples), columnsPerChunk):
+        columns = samples[start:start + columnsPerChunk]
+        positions = numpy.arange(len(columns))
+        sums = numpy.add.reduceat(backend.distances(order, columns), starts, axis=0)
+
+        ownClusters = numpy.searchsorted(clusters, labels[columns])
+        ownSizes = sizes[labels[columns]]
+        within = sums[ownClusters, positions] / numpy.maximum(ownSizes - 1, 1)
+        means = sums / sizes[clusters][:, None]
+        means[ownClusters, positions] = numpy.inf
+        between = means.min(axis=0)
+
+        largest = numpy.maximum(within, between)
+        chunk = numpy.zeros(len(columns))
+        valid = (ownSizes > 1) & (largest > 0)
+        chunk[valid] = (between[valid] - within[valid]) / largest[valid]
+        silhouettes[start:start + len(columns)] = chunk
+    return silhouettes
+
+
+def silhouette(backend, labels: numpy.ndarray, sampleSize: Optional[int] = None, randomState=None,
+               chunkSize=4_000_000) -> float:
+    '''
+        This function computes the mean silhouette of a clustering, exactly or on a random sample of tweets
+        The sampled silhouette compares sampleSize tweets with every tweet, so it costs sampleSize columns
+        of distances instead of the full matrix
+
+        Parameters:
+        -----------
+            backend:
+                The distance backend built over the clustered tweets
+
+            labels:
+                The cluster of every tweet
+
+            sampleSize:
+                The number of tweets whose silhouette is averaged, None for all of them
+
+            randomState:
+                The seed of the sample, so runs can be reproduced
+
+            chunkSize:
+                The maximum number of distances held in memory at once
+
+        Returns:
+        --------
+            The mean silhouette, between -1 and 1, higher is better
+
+        Example:
+        --------
+            >>> kmeans.fit(corpus)
+            >>> silhouette(SparseJaccard(corpus), kmeans.getLabels(), sampleSize=1000, randomState=42)
+            0.0421
+    '''
+    if sampleSize is None or sampleSize >= len(labels):
+        samples = range(len(labels))
+    else:
+        samples = sorted(random.Random(randomState).sample(range(len(labels)), sampleSize))
+    return float(silhouetteSamples(backend, labels, samples, chunkSize).mean())
+
+
+def daviesBouldin(backend, labels: numpy.ndarray, distances: numpy.ndarray, centroidIndices: Sequence[int]) -> float:
+    '''
+        This function computes the Davies-Bouldin index of a clustering from its medoids
+        The scatter of a cluster is the mean distance of its members to its medoid, the index is the mean over
+        the clusters of the largest (scatter_i + scatter_j) / d(medoid_i, medoid_j) over the other clusters
+        Only the k x k distances between the medoids are computed
+
+        Parameters:
+        -----------
+            backend:
+                The distance backend built over the clustered tweets
+
+            labels:
+                The cluster of every tweet
+
+            distances:
+                The distance of every tweet to its medoid
+
+            centroidIndices:
+                The index of the medoid of every cluster
+
+        Returns:
+        --------
+            The Davies-Bouldin index, lower is better, inf when two clusters have identical medoids
+    '''
+    centroidIndices = numpy.asarray(centroidIndices)
+    sizes = numpy.bincount(labels, minlength=len(centroidIndices))
+    clusters = numpy.flatnonzero(sizes)
+    if len(clusters) < 2:
+        raise ValueError('The Davies-Bouldin index needs at least 2 non empty clusters')
+
+    scatters = numpy.bincount(labels, weights=numpy.asarray(distances, dtype=numpy.float64), minlength=len(sizes))
+    scatters = scatters[clusters] / sizes[clusters]
+    separations = backend.distances(centroidIndices[clusters], centroidIndices[clusters])
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        ratios = (scatters[:, None] + scatters[None, :]) / separations
+    ratios[numpy.isnan(ratios)] = numpy.inf
+    numpy.fill_diagonal(ratios, -numpy.inf)
+    return float(ratios.max(axis=1).mean())
+
+
+def clusterStatistics(labels: numpy.ndarray, distances: numpy.ndarray, clustersCount: int) -> Dict[str, numpy.ndarray]:
+    '''
+        This function summarizes the size and the cohesion of every cluster from the fitted arrays,
+        without computing any distance
+
+        Parameters:
+        -----------
+            labels:
+                The cluster of every tweet
+
+            distances:
+                The distance of every tweet to its medoid
+
+            clustersCount:
+                The number of clusters
+
+        Returns:
+        --------
+            A dictionary of arrays with one value per cluster:
+            sizes, meanDistances (the cohesion), maxDistances and sse
+    '''
+    distances = numpy.asarray(distances, dtype=numpy.float64)
+    sizes = numpy.bincount(labels, minlength=clustersCount)
+    maxDistances = numpy.zeros(clustersCount)
+    numpy.maximum.at(maxDistances, labels, distances)
+    return {
+        'sizes': sizes,
+        'meanDistances': numpy.bincount(labels, weights=distances, minlength=clustersCount) / numpy.maximum(sizes, 1),
+        'maxDistances': maxDistances,
+        'sse': numpy.bincount(labels, weights=distances ** 2, minlength=clustersCount),
+    }
@@ -0,0 +1,143 @@
+import numpy
+
+from app.model.corpus import Corpus
+
+# mersenne prime used as the modulus of the universal hash functions
+PRIME = (1 << 31) - 1
+
+
+class MinHashLSH:
+    '''
+        This Class computes MinHash signatures of tweets and uses LSH banding to find candidate medoids
+        The signature of a tweet is split into bands of rows, two tweets are candidates of each other
+        when they agree on every row of at least one band, which happens with probability
+        1 - (1 - s^rows)^bands for tweets of jaccard similarity s
+
+        Methods:
+        --------
+            signatures:
+                This method returns the MinHash signatures of all tweets of a corpus
+            bandKeys:
+                This method reduces every band of a signature to one integer key
+            candidates:
+                This method returns which medoids are candidates of every tweet
+
+
+        Attributes:
+        -----------
+            bands:
+                The number of bands of a signature
+            rows:
+                The number of signature rows in every band
+            measureRecall:
+                If True KMeans also runs the exact assignment to report the recall of the LSH assignment
+            __coefficients:
+                The (a, b) coefficients of the hash functions h(x) = (a * x + b) mod PRIME
+            __bandMultipliers:
+                The random multipliers used to combine the rows of a band into a key
+
+
+        Example:
+        --------
+            >>> corpus = Corpus.fromTexts(['a b c', 'a b c d', 'x y z'])
+
+            >>> lsh = MinHashLSH(bands=16, rows=2)
+            >>> keys = lsh.bandKeys(lsh.signatures(corpus))
+            >>> lsh.candidates(keys, keys[[0]])
+            array([[ True],
+                   [ True],
+                   [False]])
+    '''
+
+    def __init__(self, bands=32, rows=2, seed=0, measureRecall=False):
+        self.bands = bands
+        self.rows = rows
+        self.measureRecall = measureRecall
+
+        generator = numpy.random.RandomState(seed)
+        hashesCount = bands * rows
+        self.__coefficients = (
+            generator.randint(1, PRIME, size=hashesCount).astype(numpy.int64),
+            generator.randint(0, PRIME, size=hashesCount).astype(numpy.int64),
+        )
+        self.__bandMultipliers = generator.randint(1, PRIME, size=rows).astype(numpy.uint64) | numpy.uint64(1)
+
+    def signatures(self, corpus: Corpus) -> numpy.ndarray:
+        '''
+            This method computes the MinHash signatures of all tweets of a corpus
+            Every hash function is applied once to the whole vocabulary, then the minimum of every tweet
+            is reduced over its slice of the flat token buffer
+
+            Parameters:
+            -----------
+                corpus:
+                    The encoded tweets
+
+            Returns:
+            --------
+                An int64 array of shape (len(corpus), bands * rows), empty tweets get PRIME in every row
+        '''
+        tokenIds = numpy.arange(len(corpus.vocabulary), dtype=numpy.int64) % PRIME
+        lengths = corpus.lengths()
+        nonEmpty = lengths > 0
+        starts = corpus.offsets[:-1][nonEmpty]
+
+        signatures = numpy.full((len(corpus), self.bands * self.rows), PRIME, dtype=numpy.int64)
+        if len(corpus.tokens) == 0:
+            return signatures
+
+        for hashIndex, (a, b) in enumerate(zip(*self.__coefficients)):
+            tokenHashes = (a * tokenIds + b) % PRIME
+            signatures[nonEmpty, hashIndex] = numpy.minimum.reduceat(tokenHashes[corpus.tokens], starts)
+        return signatures
+
+    def bandKeys(self, signatures: numpy.ndarray) -> numpy.ndarray:
+        '''
+            This method combines the rows of every band of the signatures into one key
+
+            Parameters:
+            -----------
+                signatures:
+                    The MinHash signatures of shape (n, bands * rows)
+
+            Returns:
+            --------
+                An uint64 array of shape (n, bands)
+        '''
+        bands = signatures.reshape(len(signatures), self.bands, self.rows).astype(numpy.uint64)
+        # multiplication wraps around modulo 2^64, which is what we want for a hash
+        with numpy.errstate(over='ignore'):
+            return (bands * self.__bandMultipliers).sum(axis=2, dtype=numpy.uint64)
+
+    def candidates(self, tweetKeys: numpy.ndarray, medoidKeys: numpy.ndarray) -> numpy.ndarray:
+        '''
+            This method finds the candidate medoids of every tweet
+            For every band the medoid keys are sorted and the tweet keys are binary searched in them
+
+            Parameters:
+            -----------
+                tweetKeys:
+                    The band keys of the tweets, of shape (n, bands)
+
+                medoidKeys:
+                    The band keys of the medoids, of shape (k, bands)
+
+            Returns:
+            --------
+                A boolean array of shape (n, k), True where the medoid is a candidate of the tweet
+        '''
+        candidates = numpy.zeros((len(tweetKeys), len(medoidKeys)), dtype=bool)
+        for band in range(self.bands):
+            order = numpy.argsort(medoidKeys[:, band], kind='stable')
+            sortedKeys = medoidKeys[order, band]
+            left = numpy.searchsorted(sortedKeys, tweetKeys[:, band], side='left')
+            counts = numpy.searchsorted(sortedKeys, tweetKeys[:, band], side='right') - left
+            if not counts.any():
+                continue
+
+            # expand every (tweet, matching range of medoids) into (tweet, medoid) pairs
+            tweets = numpy.repeat(numpy.arange(len(tweetKeys)), counts)
+            rangeStarts = numpy.repeat(numpy.cumsum(counts) - counts, counts)
+            positions = numpy.repeat(left, counts) + numpy.arange(len(tweets)) - rangeStarts
+            candidates[tweets, order[positions]] = True
+        return candidates
@@ -0,0 +1,259 @@
+import random
+from array import array
+from itertools import islice
+from typing import Iterable, Iterator, List
+
+import numpy
+
+from app.model.corpus import Corpus, Vocabulary
+from app.model.jaccard import SparseJaccard
+from app.model.kmeans import KMeans
+
+
+def batches(tweets: Iterable[List[str]], batchSize: int) -> Iterator[List[List[str]]]:
+    '''
+        This function splits a stream of tweets into lists of at most batchSize tweets
+
+        Parameters:
+        -----------
+            tweets:
+                The stream of tweets
+
+            batchSize:
+                The maximum number of tweets of a batch
+
+        Returns:
+        --------
+            An iterator over the batches
+    '''
+    iterator = iter(tweets)
+    while True:
+        batch = list(islice(iterator, batchSize))
+        if not batch:
+            return
+        yield batch
+
+
+class MiniBatchKMeans:
+    '''
+        This Class is used to Perform K-Medoids Clustering on a stream of tweets that does not fit in memory
+        Only one batch of tweets is in memory at a time: every cluster keeps a uniform reservoir sample
+        of its members, the medoid is elected again from the reservoir after every batch,
+        then a final pass streams the tweets again to assign them to the final medoids
+
+        Methods:
+        --------
+            fit:
+                This method clusters a re-iterable stream of tweets
+            getCentroids:
+                This method returns the centroids of the clusters formed
+            getSSE:
+                This method returns the sum of squared errors of the final assignment
+            getClusterSizes:
+                This method returns the number of tweets of every cluster
+            getLabels:
+                This method returns the cluster of every tweet, if keepLabels is True
+
+
+        Attributes:
+        -----------
+            __clustersCount:
+                The number of clusters to be formed
+            __batchSize:
+                The number of tweets read at once
+            __reservoirSize:
+                The number of members sampled by every cluster to elect its medoid
+            __passes:
+                The number of update passes over the stream before the final assignment
+            __keepLabels:
+                If True the cluster of every tweet is kept in a compact int array
+            __vocabulary:
+                The vocabulary shared by all the batches
+            __medoids:
+                The token ids of the medoid of every cluster
+            __reservoirs:
+                The sampled members of every cluster, as token ids
+            __seen:
+                The number of members every cluster has seen, used by the reservoir sampling
+
+
+        Example:
+        --------
+            >>> tweets = TweetsReader('dataset/csv/bbchealth.csv', 'dataset/csv/cnnhealth.csv')
+
+            >>> kmeans = MiniBatchKMeans(clustersCount=5, batchSize=2000)
+            >>> kmeans.fit(tweets)
+            >>> sse = kmeans.getSSE()
+    '''
+
+    def __init__(self, clustersCount=4, batchSize=2048, reservoirSize=256, passes=1, keepLabels=True,
+                 randomState=None):
+        self.__clustersCount = clustersCount
+        self.__batchSize = batchSize
+        self.__reservoirSize = reservoirSize
+        self.__passes = passes
+        self.__keepLabels = keepLabels
+        self.__randomState = randomState
+        self.__random = random.Random(randomState)
+        self.__vocabulary = Vocabulary()
+        self.__medoids: List[numpy.ndarray] = []
+        self.__reservoirs: List[List[numpy.ndarray]] = []
+        self.__seen: List[int] = []
+        self.__labels = array('i')
+        self.__clusterSizes = numpy.zeros(clustersCount, dtype=numpy.int64)
+        self.__sse = 0.0
+
+    def fit(self, tweets: Iterable[List[str]]) -> None:
+        '''
+            This method clusters a stream of tweets
+
+            Parameters:
+            -----------
+                tweets:
+                    A re-iterable stream of tweets represented as lists of strings, like a TweetsReader,
+                    it is read passes + 1 times
+
+            Returns:
+            --------
+                None
+        '''
+        if iter(tweets) is tweets:
+            raise ValueError('The tweets are read several times, give an iterable like TweetsReader, not an iterator')
+
+        for _ in range(self.__passes):
+            for batch in batches(tweets, self.__batchSize):
+                rows = [self.__vocabulary.encode(tweet) for tweet in batch]
+                if not self.__medoids:
+                    self.__seed(rows)
+                self.__update(rows)
+
+        self.__assign(tweets)
+
+    def __seed(self, rows: List[numpy.ndarray]) -> None:
+        '''
+            This method chooses the first medoids by clustering the first batch
+
+            Parameters:
+            -----------
+                rows:
+                    The encoded tweets of the first batch
+
+            Returns:
+            --------
+                None
+        '''
+        corpus = Corpus.fromRows(self.__vocabulary, rows)
+        _, _, inverse = corpus.deduplicate()
+        if len(set(inverse.tolist())) < self.__clustersCount:
+            raise ValueError(f'The first batch has less than { self.__clustersCount } distinct tweets')
+
+        model = KMeans(self.__clustersCount, maxIterations=5, initialization='kmedoids++',
+                       randomState=self.__randomState, deduplicate=True)
+        model.fit(corpus)
+        self.__medoids = [self.__vocabulary.encode(centroid) for centroid in model.getCentroids()]
+        self.__reservoirs = [[] for _ in self.__medoids]
+        self.__seen = [0 for _ in self.__medoids]
+
+    def __closest(self, rows: List[numpy.ndarray]):
+        '''
+            This method finds the closest medoid of every tweet of a batch
+            Tweets sharing no token with any medoid go to a random cluster, like in KMeans
+
+            Parameters:
+            -----------
+                rows:
+                    The encoded tweets of the batch
+
+            Returns:
+            --------
+                A tuple of (labels, distances) arrays
+        '''
+        backend = SparseJaccard(Corpus.fromRows(self.__vocabulary, self.__medoids + rows))
+        distances = backend.distances(range(len(self.__medoids), len(self.__medoids) + len(rows)), range(len(self.__medoids)))
+        labels = distances.argmin(axis=1)
+        minDistances = distances[range(len(rows)), labels]
+        for index in numpy.flatnonzero(minDistances == 1):
+            labels[index] = self.__random.randint(0, len(self.__medoids) - 1)
+        return labels, minDistances
+
+    def __update(self, rows: List[numpy.ndarray]) -> None:
+        '''
+            This method adds a batch to the reservoirs of its clusters and elects their medoids again
+
+            Parameters:
+            -----------
+                rows:
+                    The encoded tweets of the batch
+
+            Returns:
+            --------
+                None
+        '''
+        labels, _ = self.__closest(rows)
+        for row, cluster in zip(rows, labels):
+            # reservoir sampling keeps every member seen with the same probability
+            self.__seen[cluster] += 1
+            if len(self.__reservoirs[cluster]) < self.__reservoirSize:
+                self.__reservoirs[cluster].append(row)
+            else:
+                position = self.__random.randrange(self.__seen[cluster])
+                if position < self.__reservoirSize:
+                    self.__reservoirs[cluster][position] = row
+
+        for cluster in set(labels.tolist()):
+            self.__medoids[cluster] = self.__electMedoid(cluster)
+
+    def __electMedoid(self, cluster: int) -> numpy.ndarray:
+        '''
+            This method elects the candidate, among the reservoir and the current medoid,
+            with the minimum sum of distances to the reservoir
+
+            Parameters:
+            -----------
+                cluster:
+                    The index of the cluster
+
+            Returns:
+            --------
+                The token ids of the new medoid
+        '''
+        reservoir = self.__reservoirs[cluster]
+        candidates = reservoir + [self.__medoids[cluster]]
+        backend = SparseJaccard(Corpus.fromRows(self.__vocabulary, candidates))
+        distanceSums = backend.distances(range(len(reservoir)), range(len(candidates))).sum(axis=0)
+        return candidates[int(distanceSums.argmin())]
+
+    def __assign(self, tweets: Iterable[List[str]]) -> None:
+        '''
+            This method streams the tweets again and assigns them to the final medoids
+
+            Parameters:
+            -----------
+                tweets:
+                    The re-iterable stream of tweets
+
+            Returns:
+            --------
+                None
+        '''
+        self.__labels = array('i')
+        self.__clusterSizes = numpy.zeros(len(self.__medoids), dtype=numpy.int64)
+        self.__sse = 0.0
+        for batch in batches(tweets, self.__batchSize):
+            labels, distances = self.__closest([self.__vocabulary.encode(tweet) for tweet in batch])
+            self.__clusterSizes += numpy.bincount(labels, minlength=len(self.__medoids))
+            self.__sse += float((distances ** 2).sum())
+            if self.__keepLabels:
+                self.__labels.extend(labels.tolist())
+
+    def getCentroids(self) -> List[List[str]]:
+        return [self.__vocabulary.decode(medoid) for medoid in self.__medoids]
+
+    def getSSE(self) -> float:
+        return self.__sse
+
+    def getClusterSizes(self) -> numpy.ndarray:
+        return self.__clusterSizes
+
+    def getLabels(self) -> array:
+        return self.__labels
@@ -0,0 +1,172 @@
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional, Sequence
+
+import numpy
+
+from app.model.corpus import Corpus, Vocabulary
+from app.model.jaccard import SparseJaccard
+
+# the backend and the shared memory blocks of a worker process, set once by __initializeWorker
+_workerBackend = None
+_workerBlocks = []
+
+
+class SharedCorpus:
+    '''
+        This Class places the flat buffers of a corpus in shared memory so worker processes can attach to them
+        without the tweets being pickled to every worker on every task
+
+        Methods:
+        --------
+            attach:
+                This method rebuilds a corpus over the shared buffers inside a worker
+            close:
+                This method releases the shared memory blocks
+
+
+        Attributes:
+        -----------
+            descriptor:
+                The picklable description (names, shapes, dtypes) of the shared buffers
+            __blocks:
+                The shared memory blocks owned by this process
+
+
+        Example:
+        --------
+            >>> shared = SharedCorpus(corpus)
+            >>> workerCorpus, blocks = SharedCorpus.attach(shared.descriptor)
+            >>> shared.close()
+    '''
+
+    def __init__(self, corpus: Corpus):
+        self.__blocks = []
+        self.descriptor = {'vocabularySize': len(corpus.vocabulary), 'arrays': {}}
+        for name in ('tokens', 'offsets'):
+            array = getattr(corpus, name)
+            block = SharedMemory(create=True, size=max(array.nbytes, 1))
+            numpy.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+            self.descriptor['arrays'][name] = (block.name, array.shape, array.dtype.str)
+            self.__blocks.append(block)
+
+    @staticmethod
+    def attach(descriptor: dict):
+        '''
+            This method attaches to the shared buffers of a corpus
+
+            Parameters:
+            -----------
+                descriptor:
+                    The descriptor of the SharedCorpus
+
+            Returns:
+            --------
+                A tuple of (corpus, blocks), the blocks must be kept alive as long as the corpus is used
+        '''
+        arrays, blocks = {}, []
+        for name, (blockName, shape, dtype) in descriptor['arrays'].items():
+            block = SharedMemory(name=blockName)
+            arrays[name] = numpy.ndarray(shape, dtype=numpy.dtype(dtype), buffer=block.buf)
+            blocks.append(block)
+        return Corpus(Vocabulary(), arrays['tokens'], arrays['offsets']), blocks
+
+    def close(self) -> None:
+        for block in self.__blocks:
+            block.close()
+            block.unlink()
+        self.__blocks = []
+
+
+def _initializeWorker(descriptor: dict) -> None:
+    global _workerBackend, _workerBlocks
+    corpus, _workerBlocks = SharedCorpus.attach(descriptor)
+    _workerBackend = SparseJaccard(corpus, vocabularySize=descriptor['vocabularySize'])
+
+
+def _distances(rows: numpy.ndarray, columns: Sequence[int]) -> numpy.ndarray:
+    return _workerBackend.distances(rows, columns)
+
+
+def _columnSums(members: numpy.ndarray, columns: Sequence[int], weights: Optional[numpy.ndarray]) -> numpy.ndarray:
+    distances = _workerBackend.distances(members, columns)
+    if weights is not None:
+        distances *= weights[:, None]
+    # accumulate top to bottom exactly like the serial medoid update
+    return distances.cumsum(axis=0)[-1]
+
+
+class DistancePool:
+    '''
+        This Class computes blocks of jaccard distances in a pool of worker processes
+        The corpus is placed in shared memory once, every task only sends the indices of the tweets
+
+        Methods:
+        --------
+            distances:
+                This method computes a block of distances, splitting the rows between the workers
+            columnSums:
+                This method computes the sums of the distance columns, splitting the columns between the workers
+            close:
+                This method stops the workers and releases the shared memory
+
+
+        Example:
+        --------
+            >>> with DistancePool(corpus, jobsCount=4) as pool:
+            ...     distances = pool.distances(range(len(corpus)), [0, 1, 2])
+    '''
+
+    def __init__(self, corpus: Corpus, jobsCount: int):
+        self.__jobsCount = jobsCount
+        self.__shared = SharedCorpus(corpus)
+        try:
+            self.__pool = multiprocessing.Pool(jobsCount, _initializeWorker, (self.__shared.descriptor,))
+        except BaseException:
+            self.__shared.close()
+            raise
+
+    def __enter__(self) -> 'DistancePool':
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+    def distances(self, rows: Sequence[int], columns: Sequence[int]) -> numpy.ndarray:
+        chunks = [chunk for chunk in numpy.array_split(numpy.asarray(rows), self.__jobsCount) if len(chunk) > 0]
+        if not chunks:
+            return numpy.empty((0, len(columns)), dtype=numpy.float64)
+        columns = list(columns)
+        return numpy.vstack(self.__pool.starmap(_distances, [(chunk, columns) for chunk in chunks]))
+
+    def columnSums(self, members: Sequence[int], columns: Sequence[int],
+                   weights: Optional[numpy.ndarray] = None) -> numpy.ndarray:
+        '''
+            This method computes, for every column tweet, the sum of its distances to all the member tweets
+            Every worker gets all the members and a share of the columns, so every sum is accumulated
+            in the same order as in a single process
+
+            Parameters:
+            -----------
+                members:
+                    The indices of the row tweets
+
+                columns:
+                    The indices of the column tweets
+
+                weights:
+                    Optional weights of the members
+
+            Returns:
+            --------
+                A float64 array of length len(columns)
+        '''
+        members = numpy.asarray(members)
+        chunks = [chunk for chunk in numpy.array_split(numpy.asarray(columns), self.__jobsCount) if len(chunk) > 0]
+        sums = self.__pool.starmap(_columnSums, [(members, chunk, weights) for chunk in chunks])
+        return numpy.concatenate(sums)
+
+    def close(self) -> None:
+        self.__pool.close()
+        self.__pool.join()
+        self.__shared.close()
@@ -0,0 +1,216 @@
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from queue import Empty
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+from app.model.corpus import Corpus
+from app.model.jaccard import SparseJaccard
+from app.model.kmeans import FitCancelled, KMeans
+from app.model.metrics import METRICS
+from app.model.parallel import SharedCorpus
+from app.model.sweep import DistanceCache, _score
+
+# the seconds between two checks of the progress of the workers
+PROGRESS_INTERVAL = 0.1
+
+# the corpus, the distance cache, the progress queue and the cancellation event of a worker process,
+# set once by _initializeSweepWorker
+_workerCorpus = None
+_workerCache = None
+_workerBlocks = []
+_workerProgress = None
+_workerCancel = None
+
+
+def availableCores() -> int:
+    '''
+        This function returns the number of cores this process may run on, which can be less than the cores
+        of the machine when the process is pinned to some of them
+    '''
+    if hasattr(os, 'sched_getaffinity'):
+        return max(1, len(os.sched_getaffinity(0)))
+    return os.cpu_count() or 1
+
+
+def _initializeSweepWorker(descriptor: dict, vocabulary, memoryLimit: int, progress, cancel) -> None:
+    global _workerCorpus, _workerCache, _workerBlocks, _workerProgress, _workerCancel
+    _workerProgress, _workerCancel = progress, cancel
+    corpus, _workerBlocks = SharedCorpus.attach(descriptor)
+    _workerCorpus = Corpus(vocabulary, corpus.tokens, corpus.offsets)
+    _workerCache = DistanceCache(SparseJaccard(_workerCorpus), memoryLimit)
+
+
+def _fitK(k: int, metrics: List[str], silhouetteSamples: int, options: dict):
+    model = KMeans(k, distance=_workerCache, **options)
+    model.fit(_workerCorpus, onIteration=lambda progress: _workerProgress.put((k, progress)), cancelToken=_workerCancel)
+    result = {'sse': model.getSSE()}
+    for metric in metrics:
+        result[metric] = _score(metric, model, _workerCache, silhouetteSamples, options.get('randomState'))
+    return k, result
+
+
+class SweepScheduler:
+    '''
+        This Class fits one model for every value of K on a bounded pool of worker processes
+        The corpus is placed in shared memory once and every worker keeps its own distance cache over it,
+        so a task only sends the value of K and gets back its result, and the results are streamed back
+        in the order the fits finish. The progress of every iteration comes back through a queue, and cancelling
+        drops the values of K that did not start yet and stops the running fits at their next check
+
+        Methods:
+        --------
+            run:
+                This method fits the values of K and returns their results, reporting each one as it is ready
+            cancel:
+                This method cancels the values of K that did not finish yet
+            close:
+                This method stops the workers and releases the shared memory
+
+
+        Attributes:
+        -----------
+            __shared:
+                The corpus in shared memory
+            __executor:
+                The pool of worker processes
+            __futures:
+                The pending fits of the current run
+            __progress:
+                The queue of the (k, progress) of every iteration of the workers
+            __cancel:
+                The event stopping the running fits
+
+
+        Example:
+        --------
+            >>> with SweepScheduler(corpus, metrics=['sampledSilhouette'], randomState=42) as scheduler:
+            ...     results = scheduler.run(range(3, 23), onResult=print)
+            3 {'sse': 1275.0, 'sampledSilhouette': 0.0421}
+            ...
+    '''
+
+    def __init__(self, tweets: Union[List[List[str]], Corpus], jobsCount: Optional[int] = None,
+                 memoryLimit=256 * 1024 ** 2, metrics: Iterable[str] = (), silhouetteSamples=1000, **options):
+        '''
+            Parameters:
+            -----------
+                tweets:
+                    The tweets, as a list of lists of strings or as a Corpus
+
+                jobsCount:
+                    The number of worker processes, the available cores if None,
+                    give the number of values of K when it is lower, the memory limit is split between the workers
+
+                memoryLimit:
+                    The maximum number of bytes of distances kept by the caches of all the workers together
+
+                metrics:
+                    The metrics to compute for every K, see sweep
+
+                silhouetteSamples:
+                    The number of tweets of the sampled silhouette
+
+                options:
+                    Other arguments given to every KMeans, like maxIterations or randomState
+        '''
+        self.__metrics = list(metrics)
+        for metric in self.__metrics:
+            if metric not in METRICS:
+                raise ValueError(f'Unknown metric { metric }, expected one of { METRICS }')
+        self.__silhouetteSamples = silhouetteSamples
+        self.__options = options
+        self.__futures: Dict[Future, int] = {}
+        self.__jobsCount = jobsCount or availableCores()
+        self.__progress = multiprocessing.Queue()
+        self.__cancel = multiprocessing.Event()
+
+        corpus = tweets if isinstance(tweets, Corpus) else Corpus.fromTweets(tweets)
+        self.__shared = SharedCorpus(corpus)
+        try:
+            self.__executor = ProcessPoolExecutor(
+                self.__jobsCount, initializer=_initializeSweepWorker,
+                initargs=(self.__shared.descriptor, corpus.vocabulary, memoryLimit // self.__jobsCount,
+                          self.__progress, self.__cancel))
+        except BaseException:
+            self.__shared.close()
+            raise
+
+    def __enter__(self) -> 'SweepScheduler':
+        return self
+
+    def __exit__(self, *exception) -> None:
+        self.close()
+
+    def run(self, ks: Iterable[int], onResult: Optional[Callable[[int, dict], None]] = None,
+            onIteration: Optional[Callable[[int, dict], None]] = None,
+            onError: Optional[Callable[[int, BaseException], None]] = None) -> Dict[int, dict]:
+        '''
+            This method fits every value of K on the workers
+
+            Parameters:
+            -----------
+                ks:
+                    The values of K to fit
+
+                onResult:
+                    An optional function called with (k, result) as soon as a value of K is fitted
+
+                onIteration:
+                    An optional function called with (k, progress) after every iteration of every fit,
+                    see KMeans.fit for the progress dictionary
+
+                onError:
+                    An optional function called with (k, error) when the fit of a value of K fails,
+                    the other values of K are still fitted
+
+            Returns:
+            --------
+                A dictionary mapping every fitted K to its result, like sweep, without the values of K
+                that were cancelled or failed
+        '''
+        self.__cancel.clear()
+        # the largest values of K take the longest, they are started first so the last fits to finish are short
+        self.__futures = {
+            self.__executor.submit(_fitK, k, self.__metrics, self.__silhouetteSamples, self.__options): k
+            for k in sorted(ks, reverse=True)
+        }
+        results = {}
+        pending = set(self.__futures)
+        while pending:
+            done, pending = wait(pending, timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+            self.__reportProgress(onIteration)
+            for future in done:
+                if future.cancelled() or isinstance(future.exception(), FitCancelled):
+                    continue
+                if future.exception() is not None:
+                    # a failed value of K is skipped, the results of the others are kept
+                    if onError is not None:
+                        onError(self.__futures[future], future.exception())
+                    continue
+                k, result = future.result()
+                results[k] = result
+                if onResult is not None:
+                    onResult(k, result)
+        self.__reportProgress(onIteration)
+        self.__futures = {}
+        return results
+
+    def __reportProgress(self, onIteration: Optional[Callable[[int, dict], None]]) -> None:
+        while True:
+            try:
+                k, progress = self.__progress.get_nowait()
+            except Empty:
+                return
+            if onIteration is not None:
+                onIteration(k, progress)
+
+    def cancel(self) -> None:
+        # the queued fits are dropped, the running ones stop at their next check of the event
+        for future in list(self.__futures):
+            future.cancel()
+        self.__cancel.set()
+
+    def close(self) -> None:
+        self.__executor.shutdown(wait=True, cancel_futures=True)
+        self.__shared.close()
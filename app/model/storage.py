@@ -0,0 +1,80 @@
+import json
+from os import makedirs, replace
+from os.path import join
+
+import numpy
+
+# bumped whenever the layout of the saved files changes
+FORMAT_VERSION = 1
+
+
+def writeArray(directory: str, name: str, array: numpy.ndarray) -> dict:
+    '''
+        This function writes an array as raw bytes, so it can be memory mapped when read back
+
+        Parameters:
+        -----------
+            directory:
+                The directory to write in
+
+            name:
+                The name of the array, the file is <name>.bin
+
+            array:
+                The array to write
+
+        Returns:
+        --------
+            The description (dtype, shape) of the array, to be kept in the metadata
+    '''
+    makedirs(directory, exist_ok=True)
+    array = numpy.ascontiguousarray(array)
+    # the array can be memory mapped from the file it replaces, so it is written next to it and moved in place
+    path = join(directory, f'{ name }.bin')
+    array.tofile(f'{ path }.tmp')
+    replace(f'{ path }.tmp', path)
+    return {'dtype': array.dtype.str, 'shape': list(array.shape)}
+
+
+def readArray(directory: str, name: str, description: dict, mmap=True) -> numpy.ndarray:
+    '''
+        This function reads an array written by writeArray
+
+        Parameters:
+        -----------
+            directory:
+                The directory to read from
+
+            name:
+                The name of the array
+
+            description:
+                The description returned by writeArray
+
+            mmap:
+                If True the file is memory mapped read only instead of being loaded in memory
+
+        Returns:
+        --------
+            The array
+    '''
+    dtype, shape = numpy.dtype(description['dtype']), tuple(description['shape'])
+    path = join(directory, f'{ name }.bin')
+    # an empty file cannot be memory mapped
+    if not mmap or numpy.prod(shape) == 0:
+        return numpy.fromfile(path, dtype=dtype).reshape(shape)
+    return numpy.memmap(path, dtype=dtype, mode='r', shape=shape)
+
+
+def writeMetadata(directory: str, metadata: dict) -> None:
+    makedirs(directory, exist_ok=True)
+    with open(join(directory, 'metadata.json'), 'w', encoding='utf-8') as file:
+        json.dump({'version': FORMAT_VERSION, **metadata}, file, indent='\t')
+
+
+def readMetadata(directory: str) -> dict:
+    with open(join(directory, 'metadata.json'), 'r', encoding='utf-8') as file:
+        metadata = json.load(file)
+    if metadata.get('version') != FORMAT_VERSION:
+        raise ValueError(f'Unsupported format version { metadata.get("version") } in { directory }')
+    return metadata
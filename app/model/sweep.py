@@ -0,0 +1,218 @@
+from collections import OrderedDict
+from functools import partial
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Union
+
+import numpy
+
+from app.model.corpus import Corpus
+from app.model.jaccard import SparseJaccard
+from app.model.kmeans import KMeans
+from app.model.metrics import METRICS, clusterStatistics, daviesBouldin, silhouette
+
+
+class DistanceCache:
+    '''
+        This Class caches the distance columns computed by a backend so they can be reused across fits
+        A column is the array of the distances of one tweet to every tweet, medoids chosen for one
+        value of K are often chosen again for the next ones, so their columns are computed only once
+        The least recently used columns are evicted when the cache goes over its memory limit
+
+        Methods:
+        --------
+            distances:
+                This method returns a block of distances, built from cached columns
+            pairDistances:
+                This method returns the distances of a list of pairs of tweets
+            getStatistics:
+                This method returns the number of hits, misses and evictions of the cache
+
+
+        Attributes:
+        -----------
+            __backend:
+                The backend computing the missing columns
+            __columns:
+                The cached columns, ordered from the least to the most recently used
+            __maximumColumns:
+                The number of columns that fit in the memory limit
+
+
+        Example:
+        --------
+            >>> cache = DistanceCache(SparseJaccard(corpus), memoryLimit=256 * 1024 ** 2)
+            >>> model = KMeans(clustersCount=3, distance=cache)
+            >>> model.fit(corpus)
+    '''
+
+    def __init__(self, backend, memoryLimit=256 * 1024 ** 2):
+        self.__backend = backend
+        self.__columns: OrderedDict = OrderedDict()
+        self.__maximumColumns = max(1, memoryLimit // (8 * max(len(backend), 1)))
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.__backend)
+
+    def distance(self, first: int, second: int) -> float:
+        return self.__backend.distance(first, second)
+
+    def distances(self, rows: Sequence[int], columns: Sequence[int]) -> numpy.ndarray:
+        '''
+            This method builds a block of distances from the cached columns, computing the missing ones
+
+            Parameters:
+            -----------
+                rows:
+                    The indices of the row tweets
+
+                columns:
+                    The indices of the column tweets
+
+            Returns:
+            --------
+                A float64 array of shape (len(rows), len(columns))
+        '''
+        columns = [int(column) for column in columns]
+        rows = numpy.asarray(rows, dtype=numpy.int64)
+        missing = [column for column in dict.fromkeys(columns) if column not in self.__columns]
+        self.__hits += len(columns) - len(missing)
+        self.__misses += len(missing)
+
+        # full columns are computed and cached when the whole distance matrix fits in the cache,
+        # or for blocks spanning most of the tweets like the assignment, otherwise the columns of
+        # small blocks, like the medoid update of a cluster, are computed for their rows only
+        computedRows = rows
+        fullMatrix = self.__maximumColumns >= len(self.__backend)
+        if (fullMatrix or len(rows) * 2 >= len(self.__backend)) and len(missing) <= self.__maximumColumns:
+            computedRows = numpy.arange(len(self.__backend))
+        # the cached columns are copied before any column is stored, storing can evict them
+        result = numpy.empty((len(rows), len(columns)), dtype=numpy.float64)
+        for position, column in enumerate(columns):
+            if column in self.__columns:
+                self.__columns.move_to_end(column)
+                result[:, position] = self.__columns[column][rows]
+        if missing:
+            distances = self.__backend.distances(computedRows, missing)
+            computed = {column: distances[:, position] for position, column in enumerate(missing)}
+            if len(computedRows) == len(self.__backend):
+                for column in missing:
+                    self.__store(column, computed[column])
+                # the full columns are read back for the requested rows only
+                computed = {column: distances[rows, position] for position, column in enumerate(missing)}
+            for position, column in enumerate(columns):
+                if column in computed:
+                    result[:, position] = computed[column]
+        return result
+
+    def pairDistances(self, first: Sequence[int], second: Sequence[int]) -> numpy.ndarray:
+        return self.__backend.pairDistances(first, second)
+
+    def tokenDistances(self, rows: Sequence[int], tokenIds: numpy.ndarray) -> numpy.ndarray:
+        return self.__backend.tokenDistances(rows, tokenIds)
+
+    def getCorpus(self) -> Corpus:
+        return self.__backend.getCorpus()
+
+    def getStatistics(self) -> Dict[str, int]:
+        return {
+            'hits': self.__hits,
+            'misses': self.__misses,
+            'evictions': self.__evictions,
+            'columns': len(self.__columns),
+        }
+
+    def __store(self, column: int, distances: numpy.ndarray) -> None:
+        self.__columns[column] = distances
+        while len(self.__columns) > self.__maximumColumns:
+            self.__columns.popitem(last=False)
+            self.__evictions += 1
+
+
+def sweep(tweets: Union[List[List[str]], Corpus], ks: Iterable[int], memoryLimit=256 * 1024 ** 2,
+          onResult: Optional[Callable[[int, dict], None]] = None, metrics: Iterable[str] = (),
+          silhouetteSamples=1000, onIteration: Optional[Callable[[int, dict], None]] = None, cancelToken=None,
+          **options) -> Dict[int, dict]:
+    '''
+        This function fits one model for every value of K over the same encoded tweets and distance cache
+        and returns the SSE of every K, which is what the elbow plot needs, with the requested quality metrics
+        The metrics reuse the fitted labels and distances and the distance cache, the sampled silhouette
+        compares the same sampled tweets for every K so their distance columns are only computed once
+
+        Parameters:
+        -----------
+            tweets:
+                The tweets, as a list of lists of strings or as a Corpus
+
+            ks:
+                The values of K to fit
+
+            memoryLimit:
+                The maximum number of bytes of distances kept by the cache
+
+            onResult:
+                An optional function called with (k, result) as soon as a value of K is fitted
+
+            metrics:
+                The metrics to compute for every K among
+                'silhouette' (exact, compares every pair of tweets),
+                'sampledSilhouette' (the silhouette of silhouetteSamples random tweets),
+                'daviesBouldin' and 'statistics' (the size and cohesion arrays of every cluster),
+                the silhouettes and the Davies-Bouldin index are nan when fewer than 2 clusters are not empty
+
+            silhouetteSamples:
+                The number of tweets of the sampled silhouette
+
+            onIteration:
+                An optional function called with (k, progress) after every iteration of every fit,
+                see KMeans.fit for the progress dictionary
+
+            cancelToken:
+                An optional object with an is_set method, the sweep raises FitCancelled soon after it is set
+
+            options:
+                Other arguments given to every KMeans, like maxIterations or randomState
+
+        Returns:
+        --------
+            A dictionary mapping every K to its result, a dictionary with the 'sse' and the requested metrics
+
+        Example:
+        --------
+            >>> results = sweep(corpus, range(3, 6), metrics=['sampledSilhouette'], randomState=42)
+            >>> {k: round(result['sse'], 1) for k, result in results.items()}
+            {3: 1275.0, 4: 1251.7, 5: 1238.2}
+    '''
+    metrics = list(metrics)
+    for metric in metrics:
+        if metric not in METRICS:
+            raise ValueError(f'Unknown metric { metric }, expected one of { METRICS }')
+
+    corpus = tweets if isinstance(tweets, Corpus) else Corpus.fromTweets(tweets)
+    cache = DistanceCache(SparseJaccard(corpus), memoryLimit)
+
+    results = {}
+    for k in ks:
+        model = KMeans(k, distance=cache, **options)
+        model.fit(corpus, onIteration=None if onIteration is None else partial(onIteration, k), cancelToken=cancelToken)
+        results[k] = {'sse': model.getSSE()}
+        for metric in metrics:
+            results[k][metric] = _score(metric, model, cache, silhouetteSamples, options.get('randomState'))
+        if onResult is not None:
+            onResult(k, results[k])
+    return results
+
+
+def _score(metric: str, model: KMeans, cache: DistanceCache, silhouetteSamples: int, randomState):
+    labels, distances = model.getLabels(), model.getDistances()
+    if metric != 'statistics' and numpy.count_nonzero(numpy.bincount(labels)) < 2:
+        # the silhouette and the Davies-Bouldin index compare clusters, they are undefined for a single one
+        return float('nan')
+    if metric == 'silhouette':
+        return silhouette(cache, labels)
+    if metric == 'sampledSilhouette':
+        return silhouette(cache, labels, sampleSize=silhouetteSamples, randomState=randomState)
+    if metric == 'daviesBouldin':
+        return daviesBouldin(cache, labels, distances, model.getCentroidIndices())
+    return clusterStatistics(labels, distances, len(model.getCentroids()))
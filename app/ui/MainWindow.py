@@ -1,13 +1,16 @@
 
 import math
-import multiprocessing
+import queue
 import threading
 
 import mplcursors
 import pandas
-from app.model.kmeans import KMeans
+from app.model.corpus import Corpus
+from app.model.scheduler import SweepScheduler, availableCores
 from app.ui.SplashScreen import SplashScreen
-from app.utils.files import countRowsInCSV, filesInDirectory
+from app.utils.catalog import DatasetCatalog
+from app.utils.columnar import COLUMNAR_EXTENSION, readColumn
+from app.utils.files import isUpToDate
 from matplotlib.backends.backend_qt5agg import \
     FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import \
@@ -17,14 +20,21 @@ from PyQt5 import QtCore, QtGui, QtWidgets
 
 
 class Window(QtWidgets.QMainWindow):
+    # emitted by the catalog thread with the index and the number of tweets of a data set
+    rowsCounted = QtCore.pyqtSignal(int, int)
+    # emitted by the clustering thread with the results of every value of K
+    clusteringFinished = QtCore.pyqtSignal(object)
+
     def __init__(self):
         super().__init__()
-        self.processes = []
-        self.manager = multiprocessing.Manager()
-        self.return_dict = self.manager.dict()
+        # the progress and the results of the clustering thread, read by the timer in the GUI thread
+        self.events = queue.Queue()
+        self.finishedExperiments = 0
 
         self.splashScreen = SplashScreen()
         self.clusteringThread = None
+        self.scheduler = None
+        self.clusteringFinished.connect(self.__showResults)
         self.setWindowTitle("Tweets Clustering")
         self.setGeometry(5, 30, 1920, 1080)
 
@@ -43,13 +53,15 @@ class Window(QtWidgets.QMainWindow):
         self.dummyLabel.setStyleSheet("color: #2F4454;");
 
 
-        dataSetFiles = [{"name": file.removesuffix(".csv"), "rowsCount": countRowsInCSV(f'dataset/csv/{file}')} for file in sorted(filesInDirectory('dataset/csv/')) if file.endswith('.csv')]
+        # the names are listed right away, the number of tweets of every file is added when it is known
+        self.catalog = DatasetCatalog('dataset/csv')
+        dataSetFiles = self.catalog.names()
         self.selectDataSetFile = QtWidgets.QComboBox()
-        #self.selectDataSetFile.addItems(dataSetFiles)
-        for index, file in enumerate(dataSetFiles):
-            self.selectDataSetFile.addItem(file['name'])
-            self.selectDataSetFile.setItemData(index, f"This File Contains: {file['rowsCount']} tweet", QtCore.Qt.ToolTipRole)
+        self.selectDataSetFile.addItems(dataSetFiles)
         self.selectDataSetFile.setCurrentIndex(2)
+        self.rowsCounted.connect(self.__setRowsCount)
+        self.catalogThread = threading.Thread(target=self.catalogThreadFunction, args=(dataSetFiles,), daemon=True)
+        self.catalogThread.start()
         self.selectDataSetFile.setFont(QtGui.QFont("Arial", 18))
         
         self.selectDataSetFileLabel = QtWidgets.QLabel("Select Data Set File:")
@@ -206,15 +218,40 @@ class Window(QtWidgets.QMainWindow):
         self.timer.start()
 
     def _update(self):
-        finished = len(list(self.return_dict.keys()))
-        self.splashScreen.progressBar.setValue(math.floor(100 * finished / self.experimentsCount.value()))
-        self.splashScreen.labelDescription.setText("Experiment: " + str(finished) + "/" + str(self.experimentsCount.value()))
+        description = None
+        while True:
+            try:
+                event, k, data = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if event == 'result':
+                self.finishedExperiments += 1
+            elif event == 'error' and k is not None:
+                # a failed value of K is finished too, it is left out of the plot
+                self.finishedExperiments += 1
+                self.__updateStatus(f"K = {k} failed: {data}")
+            elif event == 'error':
+                self.__updateStatus(f"Clustering failed: {data}")
+            else:
+                description = f"K = {k}, iteration {data['iteration']}: SSE {data['sse']:.1f}, " \
+                              f"{data['labelsChanged']} tweets changed cluster ({data['elapsed']:.1f} s)"
+        self.splashScreen.progressBar.setValue(math.floor(100 * self.finishedExperiments / self.experimentsCount.value()))
+        if description is not None:
+            self.splashScreen.labelDescription.setText(
+                "Experiment: " + str(self.finishedExperiments) + "/" + str(self.experimentsCount.value()) + " - " + description)
 
     def __experimentsControl(self):
+        if self.clusteringThread is not None and self.clusteringThread.is_alive():
+            # a second click cancels the values of K that did not finish yet, the finished ones are plotted
+            if self.scheduler is not None:
+                self.scheduler.cancel()
+            return
+
+        self.finishedExperiments = 0
         self.splashScreen.show()
         self.splashScreen.progressBar.setValue(0)
         
-        self.clusteringThread = threading.Thread(target=self.clusteringThreadFunction)
+        self.clusteringThread = threading.Thread(target=self.clusteringThreadFunction, daemon=True)
         self.clusteringThread.start()
 
         self.splashScreen.show()
@@ -222,38 +259,78 @@ class Window(QtWidgets.QMainWindow):
         QtWidgets.QApplication.processEvents()
 
     def clusteringThreadFunction(self):
-        dataSetFile = pandas.read_csv(f'dataset/csv/{self.selectDataSetFile.currentText()}.csv')
-        # Extract the tweets from the data set
-        tweets = [tweet.split() for tweet in dataSetFile['tweet'].astype(str)]
+        # the finished results are always plotted and the splash screen closed, even when something fails
+        results = {}
+        try:
+            self.__cluster(results)
+        except Exception as error:
+            self.events.put(('error', None, error))
+        finally:
+            self.scheduler = None
+            self.clusteringFinished.emit(results)
+
+    def __cluster(self, results: dict) -> None:
+        corpusDirectory = f'dataset/corpus/{self.selectDataSetFile.currentText()}'
+        csvPath = f'dataset/csv/{self.selectDataSetFile.currentText()}.csv'
+        # the corpus and the columnar file are only used when they are not older than the csv file,
+        # a feed updated through textToCsvConvertor.py and dataFormatter.py is read from the csv file
+        if isUpToDate(f'{corpusDirectory}/metadata.json', csvPath):
+            # the data set was prepared by ingest.py, its tweets are already encoded as token ids
+            tweets = Corpus.load(corpusDirectory)
+        elif isUpToDate(f'dataset/csv/{self.selectDataSetFile.currentText()}{COLUMNAR_EXTENSION}', csvPath):
+            # only the tweet column is read, an empty tweet gets the same 'nan' token as with pandas
+            tweetColumn = readColumn(f'dataset/csv/{self.selectDataSetFile.currentText()}{COLUMNAR_EXTENSION}', 'tweet')
+            tweets = Corpus.fromTexts(tweet or 'nan' for tweet in tweetColumn)
+        else:
+            dataSetFile = pandas.read_csv(csvPath)
+            # Extract the tweets from the data set and encode them once as token ids
+            tweets = Corpus.fromTexts(dataSetFile['tweet'].astype(str))
         # default number of experiments to be performed
         experiments = self.experimentsCount.value()
         # default value of K for K-means
         clustersCount = self.clusterCount.value()
 
-        for i in range(experiments):
-            process = multiprocessing.Process(target=self.__performClustering, args=(clustersCount + i, self.return_dict, tweets))
-            self.processes.append(process)
-            process.start()
-
-        for process in  self.processes:
-            process.join()
-
+        # fit the values of K on a pool of at most one worker per core and per value of K, so the distance
+        # cache budget is only split between busy workers, the tweets are shared with the workers once
+        # and every result and iteration is reported as soon as it is ready
+        def onResult(k, result):
+            results[k] = result
+            self.events.put(('result', k, result))
+
+        with SweepScheduler(tweets, jobsCount=max(1, min(availableCores(), experiments)),
+                            metrics=['sampledSilhouette']) as self.scheduler:
+            self.scheduler.run(range(clustersCount, clustersCount + experiments), onResult=onResult,
+                               onIteration=lambda k, progress: self.events.put(('iteration', k, progress)),
+                               onError=lambda k, error: self.events.put(('error', k, error)))
+
+    def __showResults(self, results):
+        # runs in the GUI thread, the signal is queued from the clustering thread
         self.splashScreen.close()
-        self.__plot(sorted(list(self.return_dict.keys())), [self.return_dict[key] for key in sorted(list(self.return_dict.keys()))])
+        ks = sorted(results.keys())
+        self.__plot(ks, [results[k]['sse'] for k in ks], [results[k]['sampledSilhouette'] for k in ks])
+
+    def catalogThreadFunction(self, names):
+        for index, name in enumerate(names):
+            self.rowsCounted.emit(index, self.catalog.rowsCount(name))
+        self.catalog.save()
 
-    def __performClustering(self, clustersCount, sses, tweets):
-        model = KMeans(clustersCount)
-        model.fit(tweets)
-        sses[clustersCount] = model.getSSE()
+    def __setRowsCount(self, index: int, rowsCount: int) -> None:
+        # runs in the GUI thread, the signal is queued from the catalog thread
+        self.selectDataSetFile.setItemData(index, f"This File Contains: {rowsCount} tweet", QtCore.Qt.ToolTipRole)
 
-    def __plot(self, xData=[], yData=[]):
-        # create an axis
+    def __plot(self, xData=[], yData=[], silhouettes=[]):
+        # create an axis, the axes of the previous run are removed so they do not pile up
+        self.figure.clear()
         ax = self.figure.add_subplot(111)
 
         # plot data
         ax.plot(xData, yData, marker='o', color='b', linestyle='--', label='SSE', linewidth=2)
         ax.set_xlabel('Experiment')
         ax.set_ylabel('SSE')
+        # the silhouette has its own scale, higher is better, it is nan and left as a gap for a single cluster
+        silhouetteAx = ax.twinx()
+        silhouetteAx.plot(xData, silhouettes, marker='s', color='g', linestyle=':', label='Silhouette', linewidth=2)
+        silhouetteAx.set_ylabel('Silhouette')
         mplcursors.cursor(hover=True)
         # refresh canvas
         self.canvas.draw()
@@ -263,7 +340,7 @@ class Window(QtWidgets.QMainWindow):
         self.statusLabel.repaint()
 
     def closeEvent(self, event):
+        if self.scheduler is not None:
+            self.scheduler.cancel()
         self.splashScreen.close()
-        for process in  self.processes:
-            process.terminate()
         event.accept()
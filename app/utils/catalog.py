@@ -0,0 +1,102 @@
+import json
+from os import stat
+from os.path import exists, join
+
+from app.utils.columnar import COLUMNAR_EXTENSION, countRows
+from app.utils.files import countRowsInCSV, filesInDirectory, isUpToDate
+
+# bumped whenever the content of the index changes
+CATALOG_VERSION = 1
+
+
+class DatasetCatalog:
+	'''
+		Lists the formatted data sets of a directory with their number of tweets
+		The number of tweets of every csv file is kept in a small index file of the directory with the size and
+		modification time of the file, so a file is only counted again when it changed.
+		The count comes from the metadata of the columnar file when it is not older than the csv file,
+		otherwise from the line breaks of the csv file, read in large blocks
+
+		Parameters
+		----------
+			directory: str
+				The directory of the formatted csv files
+
+			name: str
+				The name of the index, the index file is .<name>.json
+
+		Example
+		-------
+			>>> catalog = DatasetCatalog('dataset/csv')
+			>>> catalog.names()
+			['KaiserHealthNews', 'NBChealth', 'bbchealth', ...]
+			>>> catalog.rowsCount('bbchealth')
+			3929
+			>>> catalog.save()
+	'''
+
+	def __init__(self, directory: str, name: str = 'catalog'):
+		self.directory = directory
+		self.path = join(directory, f'.{ name }.json')
+		self.files = {}
+		self.changed = False
+		if exists(self.path):
+			try:
+				with open(self.path, 'r', encoding='utf-8') as file:
+					index = json.load(file)
+			except ValueError:  # a damaged index is only a cache, it is rebuilt
+				index = {}
+			if index.get('version') == CATALOG_VERSION:
+				self.files = index['files']
+
+	def names(self) -> list[str]:
+		'''
+			Returns the names of the data sets, without reading any of them
+
+			Parameters
+			----------
+				None
+
+			Returns
+			-------
+				list[str]
+					The sorted names of the csv files, without the .csv extension
+		'''
+		return [file.removesuffix('.csv') for file in sorted(filesInDirectory(self.directory)) if file.endswith('.csv')]
+
+	def rowsCount(self, name: str) -> int:
+		'''
+			Returns the number of tweets of a data set, from the index when its csv file did not change
+
+			Parameters
+			----------
+				name: str
+					The name of the data set
+
+			Returns
+			-------
+				int
+					The number of tweets, the header of the csv file is not counted
+		'''
+		csvPath = join(self.directory, f'{ name }.csv')
+		status = stat(csvPath)
+		entry = self.files.get(name)
+		if entry is not None and entry['size'] == status.st_size and entry['mtime'] == status.st_mtime_ns:
+			return entry['rowsCount']
+
+		columnarPath = join(self.directory, f'{ name }{ COLUMNAR_EXTENSION }')
+		if isUpToDate(columnarPath, csvPath):
+			rowsCount = countRows(columnarPath)
+		else:
+			rowsCount = max(countRowsInCSV(csvPath) - 1, 0)
+		self.files[name] = {'size': status.st_size, 'mtime': status.st_mtime_ns, 'rowsCount': rowsCount}
+		self.changed = True
+		return rowsCount
+
+	def save(self) -> None:
+		# the index is only written when a count was added or replaced
+		if not self.changed:
+			return
+		with open(self.path, 'w', encoding='utf-8') as file:
+			json.dump({'version': CATALOG_VERSION, 'files': self.files}, file, indent='\t')
+		self.changed = False
@@ -0,0 +1,161 @@
+from array import array
+
+import numpy
+
+try:
+	import pyarrow
+	import pyarrow.parquet as parquet
+except ImportError:  # pyarrow is optional, the columns are stored in a numpy .npz file without it
+	pyarrow = None
+	parquet = None
+
+# The extension of the columnar files written in this environment
+COLUMNAR_EXTENSION = '.parquet' if parquet is not None else '.npz'
+
+
+class ColumnarWriter:
+	'''
+		Writes rows of strings as a columnar file, with the same writerow/writerows interface as csv.writer
+		The file is a Parquet file if pyarrow is installed, otherwise a numpy .npz file where every column
+		is one utf-8 buffer with the offsets of every value, and the number of rows is stored on its own
+		The columns are kept compact in memory and the file is written when the writer is closed
+
+		Parameters
+		----------
+			path: str
+				The path of the file, ending with .parquet or .npz
+
+			columns: list[str]
+				The names of the columns
+
+			append: bool
+				Keep the rows of the existing file and add the new rows after them
+
+		Example
+		-------
+			>>> with ColumnarWriter('dataset/csv/bbchealth.npz', ['id', 'tweet']) as writer:
+			...     writer.writerow(['585978391360221184', 'breast cancer risk test devised'])
+			>>> countRows('dataset/csv/bbchealth.npz')
+			1
+			>>> readColumn('dataset/csv/bbchealth.npz', 'tweet')
+			['breast cancer risk test devised']
+	'''
+
+	def __init__(self, path: str, columns: list[str], append: bool = False):
+		self.path = path
+		self.columns = columns
+		self.buffers = [bytearray() for _ in columns]
+		self.offsets = [array('q', [0]) for _ in columns]
+		if append:
+			for column, values in enumerate(readColumns(path, columns).values()):
+				for value in values:
+					self.__add(column, value)
+
+	def __enter__(self) -> 'ColumnarWriter':
+		return self
+
+	def __exit__(self, *exception) -> None:
+		self.close()
+
+	def __add(self, column: int, value) -> None:
+		self.buffers[column] += str(value).encode('utf-8')
+		self.offsets[column].append(len(self.buffers[column]))
+
+	def writerow(self, row: list) -> None:
+		for column in range(len(self.columns)):
+			self.__add(column, row[column])
+
+	def writerows(self, rows) -> None:
+		for row in rows:
+			self.writerow(row)
+
+	def close(self) -> None:
+		'''
+			Writes the file
+
+			Parameters
+			----------
+				None
+
+			Returns
+			-------
+				None
+		'''
+		rowsCount = len(self.offsets[0]) - 1 if self.columns else 0
+		if self.path.endswith('.parquet'):
+			if parquet is None:
+				raise ImportError('Writing a Parquet file needs pyarrow, write a .npz file instead')
+			values = {
+				name: [bytes(buffer[start:end]).decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+				for name, buffer, offsets in zip(self.columns, self.buffers, self.offsets)
+			}
+			parquet.write_table(pyarrow.table(values), self.path)
+			return
+
+		arrays = {'columns': numpy.array(self.columns), 'rowsCount': numpy.array(rowsCount)}
+		for column, (buffer, offsets) in enumerate(zip(self.buffers, self.offsets)):
+			arrays[f'data{ column }'] = numpy.frombuffer(bytes(buffer), dtype=numpy.uint8)
+			arrays[f'offsets{ column }'] = numpy.frombuffer(offsets, dtype=numpy.int64)
+		with open(self.path, 'wb') as file:
+			numpy.savez(file, **arrays)
+
+
+def readColumns(path: str, columns: list[str] = None) -> dict[str, list[str]]:
+	'''
+		Reads columns of a columnar file written by ColumnarWriter
+
+		Parameters
+		----------
+			path: str
+				The path of the file
+
+			columns: list[str]
+				The columns to read, all of them if None
+
+		Returns
+		-------
+			dict[str, list[str]]
+				The values of every column read
+	'''
+	if path.endswith('.parquet'):
+		if parquet is None:
+			raise ImportError('Reading a Parquet file needs pyarrow')
+		return parquet.read_table(path, columns=columns).to_pydict()
+
+	with numpy.load(path) as file:
+		names = file['columns'].tolist()
+		result = {}
+		for name in names if columns is None else columns:
+			# only the members of the requested columns are read from the archive
+			column = names.index(name)
+			buffer = file[f'data{ column }'].tobytes()
+			offsets = file[f'offsets{ column }'].tolist()
+			result[name] = [buffer[start:end].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+		return result
+
+
+def readColumn(path: str, column: str) -> list[str]:
+	return readColumns(path, [column])[column]
+
+
+def countRows(path: str) -> int:
+	'''
+		Returns the number of rows of a columnar file from its metadata, without reading its columns
+
+		Parameters
+		----------
+			path: str
+				The path of the file
+
+		Returns
+		-------
+			int
+				The number of rows
+	'''
+	if path.endswith('.parquet'):
+		if parquet is None:
+			raise ImportError('Reading a Parquet file needs pyarrow')
+		return parquet.read_metadata(path).num_rows
+
+	with numpy.load(path) as file:
+		return int(file['rowsCount'])
@@ -1,6 +1,10 @@
-from os import listdir  # Import the listdir function from the os module
-from os.path import (  # Import the isfile and join functions from the os.path module
-    isfile, join)
+import csv
+from os import listdir, stat  # Import the listdir and stat functions from the os module
+from os.path import (  # Import the exists, isfile and join functions from the os.path module
+    exists, isfile, join)
+
+# The size of the blocks read when counting the lines of a file
+COUNT_BLOCK_SIZE = 1 << 20
 
 
 def filesInDirectory(dir: str) -> list[str]:
@@ -43,4 +47,66 @@ def countRowsInCSV(file: str) -> int:
             10
     '''
 
-    return sum(1 for line in open(file))
+    lines, lastByte = 0, b'\n'
+    with open(file, 'rb') as csvFile:
+        # the line breaks are counted in large blocks instead of decoding every line
+        for block in iter(lambda: csvFile.read(COUNT_BLOCK_SIZE), b''):
+            lines += block.count(b'\n')
+            lastByte = block[-1:]
+    # the last line is counted even without a line break
+    return lines + (lastByte != b'\n')
+
+
+def isUpToDate(path: str, sourcePath: str) -> bool:
+    '''
+        Returns whether a file derived from another one, like a corpus or a columnar file built from a csv file,
+        exists and is not older than it
+
+        Parameters
+        ----------
+            path: str
+                the derived file
+            sourcePath: str
+                the file it was built from, a missing source file does not make the derived file out of date
+        Returns
+        -------
+            bool
+                True if the derived file can be used in place of the source file
+
+        Example
+        -------
+            >>> isUpToDate('dataset/csv/bbchealth.npz', 'dataset/csv/bbchealth.csv')
+            True
+    '''
+    if not exists(path):
+        return False
+    return not exists(sourcePath) or stat(path).st_mtime_ns >= stat(sourcePath).st_mtime_ns
+
+
+class TweetsReader:
+	'''
+		Streams the tokenized tweets of formatted csv files, one row at a time
+		Iterating the reader again reads the files again, so it can be used for several passes
+		without ever holding the whole dataset in memory
+
+		Parameters
+		----------
+			files: str
+				the csv files written by dataFormatter.py
+
+		Example
+		-------
+			>>> for tweet in TweetsReader('dataset/csv/bbchealth.csv', 'dataset/csv/cnnhealth.csv'):
+			...     print(tweet)
+			['breast', 'cancer', 'risk', 'test', 'devised']
+	'''
+
+	def __init__(self, *files: str):
+		self.files = files
+
+	def __iter__(self):
+		for file in self.files:
+			with open(file, 'r', encoding='utf-8', newline='') as csvFile:
+				for row in csv.DictReader(csvFile):
+					# an empty tweet is read as NaN by pandas, keep the same 'nan' token
+					yield (row['tweet'] or 'nan').split()
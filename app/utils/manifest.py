@@ -0,0 +1,203 @@
+import hashlib
+import json
+import multiprocessing
+from os import stat
+from os.path import exists, getsize, join
+from typing import Callable
+
+from tqdm import tqdm  # Import the tqdm module
+
+# The size of the blocks read when hashing a file
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def hashFile(path: str, size: int = None) -> str:
+	'''
+		Returns the sha256 of a file, or of its first size bytes
+
+		Parameters
+		----------
+			path: str
+				The file to hash
+
+			size: int
+				The number of bytes to hash, the whole file if None
+
+		Returns
+		-------
+			str
+				The hexadecimal digest
+
+		Example
+		-------
+			>>> hashFile('dataset/original/bbchealth.txt')
+			'5f2b...'
+	'''
+	digest = hashlib.sha256()
+	remaining = float('inf') if size is None else size
+	with open(path, 'rb') as file:
+		while remaining > 0:
+			block = file.read(int(min(HASH_BLOCK_SIZE, remaining)))
+			if not block:
+				break
+			digest.update(block)
+			remaining -= len(block)
+	return digest.hexdigest()
+
+
+class Manifest:
+	'''
+		Remembers the input files a pipeline step already processed, so running the step again only
+		processes what changed
+		For every input file it stores its size, modification time and content hash after it was processed,
+		with the version of the step, in a json file of the output directory
+
+		A file is skipped when its size and modification time did not change, or when its hash did not change.
+		A file that only grew, whose first bytes still have the recorded hash and that ended with a line break,
+		was appended to, so only its new tail needs to be processed.
+		Any other file, or any file of an older version of the step, is processed again from the start
+
+		Parameters
+		----------
+			directory: str
+				The output directory of the step, where the manifest is stored
+
+			name: str
+				The name of the step, the manifest file is .<name>-manifest.json
+
+			version: int
+				The version of the step, bump it when its output changes for the same input
+
+		Example
+		-------
+			>>> manifest = Manifest('./dataset/csv', 'conversion', version=1)
+			>>> action, offset = manifest.plan('./dataset/original/bbchealth.txt', './dataset/csv/bbchealth.csv')
+			>>> action
+			'append'
+			>>> # process the input from the byte offset, then
+			>>> manifest.record('./dataset/original/bbchealth.txt')
+			>>> manifest.save()
+	'''
+
+	def __init__(self, directory: str, name: str, version: int):
+		self.path = join(directory, f'.{ name }-manifest.json')
+		self.version = version
+		self.files = {}
+		if exists(self.path):
+			with open(self.path, 'r', encoding='utf-8') as file:
+				manifest = json.load(file)
+			if manifest.get('version') == version:
+				self.files = manifest['files']
+
+	def plan(self, inputPath: str, outputPath: str) -> tuple[str, int]:
+		'''
+			Decides how much of an input file must be processed
+
+			Parameters
+			----------
+				inputPath: str
+					The input file
+
+				outputPath: str
+					The output file of the input file, it is processed again from the start if it is missing
+
+			Returns
+			-------
+				tuple[str, int]
+					The action, 'skip', 'append' or 'full', and the byte offset to process the input from
+		'''
+		entry = self.files.get(inputPath)
+		if entry is None or not exists(outputPath):
+			return 'full', 0
+
+		status = stat(inputPath)
+		if status.st_size == entry['size'] and status.st_mtime_ns == entry['mtime']:
+			return 'skip', 0
+		if status.st_size == entry['size'] and hashFile(inputPath) == entry['hash']:
+			# touched but not modified, remember the new time so the file is not hashed again
+			entry['mtime'] = status.st_mtime_ns
+			return 'skip', 0
+		if status.st_size > entry['size'] and entry['size'] > 0 and hashFile(inputPath, entry['size']) == entry['hash']:
+			with open(inputPath, 'rb') as file:
+				file.seek(entry['size'] - 1)
+				# a tail continuing an unfinished last line cannot be processed on its own
+				if file.read(1) in (b'\n', b'\r'):
+					return 'append', entry['size']
+		return 'full', 0
+
+	def record(self, inputPath: str) -> None:
+		'''
+			Records the current state of an input file once it was processed
+			The state is read after processing, so a step writing its output over its input records its output
+
+			Parameters
+			----------
+				inputPath: str
+					The input file
+
+			Returns
+			-------
+				None
+		'''
+		status = stat(inputPath)
+		self.files[inputPath] = {'size': status.st_size, 'mtime': status.st_mtime_ns, 'hash': hashFile(inputPath)}
+
+	def save(self) -> None:
+		with open(self.path, 'w', encoding='utf-8') as file:
+			json.dump({'version': self.version, 'files': self.files}, file, indent='\t')
+
+
+def _runTask(functionAndTask: tuple) -> str:
+	# the progress bars of the workers would overlap, so they are hidden
+	function, task = functionAndTask
+	return function(*task, progress=False)
+
+
+def processFiles(manifest: Manifest, tasks: list[tuple], function: Callable[..., str], extension: str, jobs: int = 1,
+				 description: str = 'Processing Files') -> None:
+	'''
+		Runs a pipeline step on the files it planned with its manifest, then records them in the manifest and saves it
+		With more than one job the files are processed in a pool of processes, the largest remaining parts
+		first so the last ones to finish are small, and every file is recorded as soon as it is processed
+
+		Parameters
+		----------
+			manifest: Manifest
+				The manifest of the step
+
+			tasks: list[tuple]
+				The arguments of every call of function, starting with the input directory,
+				the output directory, the file name without its extension and the offset to process the file from
+
+			function: Callable[..., str]
+				The step, called with the arguments of a task and a progress keyword, returning the file name
+
+			extension: str
+				The extension of the input files, like '.txt'
+
+			jobs: int
+				The maximum number of files processed at the same time
+
+			description: str
+				The description of the progress bar
+
+		Returns
+		-------
+			None
+
+		Example
+		-------
+			>>> processFiles(manifest, [('./dataset/original', './dataset/csv', 'bbchealth', 0)], textToCsv, '.txt', jobs=4)
+	'''
+	jobs = min(jobs or 1, len(tasks)) or 1
+	if jobs == 1:
+		for task in tqdm(tasks, desc=description):  # tqdm is a progress bar
+			manifest.record(join(task[0], f'{ function(*task) }{ extension }'))
+	else:
+		tasks = sorted(tasks, key=lambda task: getsize(join(task[0], f'{ task[2] }{ extension }')) - task[3], reverse=True)
+		with multiprocessing.Pool(jobs) as pool:
+			directories = {task[2]: task[0] for task in tasks}
+			results = pool.imap_unordered(_runTask, [(function, task) for task in tasks])
+			for fileName in tqdm(results, total=len(tasks), desc=description):
+				manifest.record(join(directories[fileName], f'{ fileName }{ extension }'))
+	manifest.save()
@@ -1,18 +1,33 @@
 import csv
+import io
 import re
-from os import mkdir
-from os.path import exists
+import shutil
+from os import mkdir, remove, replace, truncate
+from os.path import exists, samefile
 from typing import List
 
 from tqdm import tqdm  # Import the tqdm module
 
+from app.utils.columnar import COLUMNAR_EXTENSION, ColumnarWriter
 from app.utils.configurationReader import Configuration
 from app.utils.files import filesInDirectory
+from app.utils.manifest import Manifest, processFiles
+
+# The version of the formatting, bump it when the formatted files change for the same input files
+FORMATTING_VERSION = 1
 
 MENTION_PATTERN = r'@([a-zA-Z0-9-_]{1,})'
 HASHTAG_PATTERN = r'#([a-zA-Z0-9-_]{1,})'
+MENTION_REGEX = re.compile(MENTION_PATTERN)
+HASHTAG_REGEX = re.compile(HASHTAG_PATTERN)
+
+# The number of formatted rows written at once
+CHUNK_ROWS = 10_000
 
-def formatLine(line: List[str]) -> None:
+# The columns of the formatted files
+FORMATTED_COLUMNS = ['id', 'date', 'time', 'tweet', 'links', 'mentions', 'hashtags']
+
+def formatLine(line: List[str]) -> List[str]:
 	'''
 		This function formats a line of data
 
@@ -23,7 +38,8 @@ def formatLine(line: List[str]) -> None:
 
 		Returns
 		-------
-			None
+			List[str]
+				The formatted line
 
 		Example
 		-------
@@ -33,11 +49,11 @@ def formatLine(line: List[str]) -> None:
 	'''
 	id, date, time, tweet, links, *_ = line # Get the data from the line and ignore the rest using the *_
 
-	extractedMentions = re.findall(MENTION_PATTERN, tweet) # Extract the mentions from the tweet
+	extractedMentions = [] # Extract the mentions from the tweet and remove them in the same pass
+	tweet = MENTION_REGEX.sub(lambda mention: extractedMentions.append(mention.group(1)) or '', tweet)
 	mentions = ','.join(extractedMentions) # combine the mentions into a string
-	tweet = re.sub(MENTION_PATTERN, '', tweet) # Remove the mentions from the tweet
 
-	extractedHashtags = re.findall(HASHTAG_PATTERN, tweet) # Extract the hashtags from the tweet
+	extractedHashtags = HASHTAG_REGEX.findall(tweet) # Extract the hashtags from the tweet
 	hashtags = ','.join(extractedHashtags) # combine the hashtags into a string
 	tweet = tweet.replace("#", "").replace("_", ' ') # Remove the hashtags from the tweet
 
@@ -48,9 +64,12 @@ def formatLine(line: List[str]) -> None:
 	return [id, date, time, tweet, links, mentions, hashtags] 
 
 
-def formatFile(inputDirectory: str, outputDirectory: str, fileName: str) -> None:
+def formatFile(inputDirectory: str, outputDirectory: str, fileName: str, offset: int = 0, columnar: bool = False,
+			   progress: bool = True) -> str:
 	'''
 		This function formats a file of data
+		The rows are read, formatted and written in chunks of CHUNK_ROWS rows, so the memory used does not
+		depend on the size of the file
 
 		Parameters
 		----------
@@ -63,28 +82,107 @@ def formatFile(inputDirectory: str, outputDirectory: str, fileName: str) -> None
 			fileName: str
 				The name of the file
 
+			offset: int
+				The byte offset to format the input file from, the formatted rows are appended to the output file
+				when it is not 0, it must be the start of a row
+				If the output file is the input file, its rows from the offset are replaced by their formatted rows
+
+			columnar: bool
+				Also write the formatted rows as a columnar file (Parquet or .npz) next to the csv file
+
+			progress: bool
+				Show a progress bar of the rows formatted
+
 		Returns
 		-------
-			None
+			str
+				The name of the formatted file
 
 		Example
 		-------
 			>>> formatFile('data/raw/', 'data/formatted/', 'tweets.csv')
 			# This will format the file tweets.csv in the data/raw/ directory and save it in the data/formatted/ directory
 	'''
-	with open(f'{ inputDirectory }/{ fileName }.csv', 'r', encoding='utf-8') as file:  # Open the text file
+	inputPath = f'{ inputDirectory }/{ fileName }.csv'
+	outputPath = f'{ outputDirectory }/{ fileName }.csv'
+	columnarPath = f'{ outputDirectory }/{ fileName }{ COLUMNAR_EXTENSION }'
+	# The rows before the offset of a columnar file that is missing are only in the csv file, it is rebuilt at the end
+	rebuildColumnar = columnar and offset > 0 and not exists(columnarPath)
+	columnarWriter = None
+	if columnar and not rebuildColumnar:
+		columnarWriter = ColumnarWriter(columnarPath, FORMATTED_COLUMNS, append=offset > 0)
+
+	# The rows are written to a temporary file, the output file can be the input file
+	temporaryPath = f'{ outputPath }.tmp'
+	with open(inputPath, 'rb') as rawFile, open(temporaryPath, 'w', encoding='utf-8') as csvFile:
+		rawFile.seek(offset)
+		reader = csv.reader(io.TextIOWrapper(rawFile, encoding='utf-8'))
+		writer = csv.writer(csvFile)  # Create a csv.writer object
+		if offset == 0:
+			next(reader, None)  # Skip the first line
+			# Write the header
+			writer.writerow(FORMATTED_COLUMNS)
+
+		chunk = []
+		for row in tqdm(reader, desc=f'Formatting { fileName }', disable=not progress):
+			# Skip the blank lines, the csv reader returns them as empty rows
+			if row == []:
+				continue
+			chunk.append(formatLine(row))
+			if len(chunk) == CHUNK_ROWS:
+				writeChunk(chunk, writer, columnarWriter)
+				chunk = []
+		writeChunk(chunk, writer, columnarWriter)
+
+	if offset == 0:
+		replace(temporaryPath, outputPath)
+	else:
+		if samefile(inputPath, outputPath):
+			truncate(outputPath, offset)  # The unformatted tail is replaced by its formatted rows
+		with open(temporaryPath, 'rb') as temporaryFile, open(outputPath, 'ab') as outputFile:
+			shutil.copyfileobj(temporaryFile, outputFile)
+		remove(temporaryPath)
+
+	if columnarWriter is not None:
+		columnarWriter.close()
+	elif rebuildColumnar:
+		csvToColumnar(outputDirectory, fileName)
+	return fileName
+
+
+def writeChunk(chunk: List[List[str]], writer, columnarWriter: ColumnarWriter = None) -> None:
+	# Write the data to the csv file (Note: the data is a list of lists of strings)
+	writer.writerows(chunk)
+	if columnarWriter is not None:
+		columnarWriter.writerows(chunk)
+
+
+def csvToColumnar(directory: str, fileName: str) -> None:
+	'''
+		This function writes the columnar file of a formatted csv file
 
-		reader = csv.reader(file)
-		next(reader)  # Skip the first line
+		Parameters
+		----------
+			directory: str
+				The directory of the formatted csv file, the columnar file is written next to it
 
-		data = [formatLine(row) for row in tqdm(reader, desc=f'Formatting { fileName }')] # Format the data
-		data = [row for row in data if row is not None or row != []] # Remove the None values
-		with open(f'{ outputDirectory }/{ fileName }.csv', 'w', encoding='utf-8') as csvFile:  # Open the csv file
-			writer = csv.writer(csvFile)  # Create a csv.writer object
-			# Write the header
-			writer.writerow(['id', 'date', 'time', 'tweet', 'links', 'mentions', 'hashtags'])
-			# Write the data to the csv file (Note: the data is a list of lists of strings)
-			writer.writerows(data)
+			fileName: str
+				The name of the file
+
+		Returns
+		-------
+			None
+
+		Example
+		-------
+			>>> csvToColumnar('./dataset/csv', 'bbchealth')
+			# This will write ./dataset/csv/bbchealth.npz, or bbchealth.parquet if pyarrow is installed
+	'''
+	with open(f'{ directory }/{ fileName }.csv', 'r', encoding='utf-8') as file, \
+		ColumnarWriter(f'{ directory }/{ fileName }{ COLUMNAR_EXTENSION }', FORMATTED_COLUMNS) as columnarWriter:
+		reader = csv.reader(file)
+		next(reader)  # Skip the header
+		columnarWriter.writerows(reader)
 
 
 def main():
@@ -117,14 +215,25 @@ def main():
 		mkdir(config["outputDirectory"])
 		print('Finished creating the output directory\n')
 
-	files = filesInDirectory(config["inputDirectory"]) # Get the list of files in the input directory
+	# Get the list of csv files in the input directory, the manifests of the pipeline are json files
+	files = [file for file in filesInDirectory(config["inputDirectory"]) if file.endswith('.csv')]
 
 	print('Formatting Data...\n')
 
-
-	for file in tqdm(files, desc="Formating Files"):  # tqdm is a progress bar
+	# The files formatted by a previous run are skipped, the files that were appended to only format their new rows
+	manifest = Manifest(config["outputDirectory"], 'formatting', FORMATTING_VERSION)
+	tasks = []
+	for file in files:
 		# Splits the file name and removes the extension
-		formatFile(config["inputDirectory"], config["outputDirectory"], file.split('.')[0])
+		fileName = file.split('.')[0]
+		action, offset = manifest.plan(f'{ config["inputDirectory"] }/{ fileName }.csv', f'{ config["outputDirectory"] }/{ fileName }.csv')
+		if action != 'skip':
+			tasks.append((config["inputDirectory"], config["outputDirectory"], fileName, offset, bool(config.get("columnar"))))
+		elif config.get("columnar") and not exists(f'{ config["outputDirectory"] }/{ fileName }{ COLUMNAR_EXTENSION }'):
+			csvToColumnar(config["outputDirectory"], fileName)
+
+	# The files are formatted by config["jobs"] processes at the same time
+	processFiles(manifest, tasks, formatFile, '.csv', config.get("jobs"), "Formating Files")
 
 	print('\nFormatting is Done Successfully!')  # Print a message to the console
 	
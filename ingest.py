@@ -0,0 +1,116 @@
+import csv
+from array import array
+from contextlib import ExitStack
+from os import makedirs
+from os.path import exists, join
+
+import numpy
+from tqdm import tqdm  # Import the tqdm module
+
+from app.model.corpus import Corpus, Vocabulary
+from app.utils.configurationReader import Configuration
+from app.utils.files import filesInDirectory
+from dataFormatter import formatLine
+from textToCsvConvertor import formatData
+
+
+def ingestFile(inputDirectory: str, fileName: str, csvDirectory: str = None, progress: bool = True) -> Corpus:
+	'''
+		Streams a raw text file through formatData and formatLine and encodes the tweets directly into a corpus,
+		so the dataset is ready for clustering after reading every line once, without the intermediate csv files
+
+		Parameters
+		----------
+			inputDirectory: str
+				The directory of the text file
+
+			fileName: str
+				The name of the file, without the .txt extension
+
+			csvDirectory: str
+				If given, the formatted csv file (the output of dataFormatter.py) is also written in this directory
+
+			progress: bool
+				Show a progress bar of the lines read
+
+		Returns
+		-------
+			Corpus
+				The tokenized tweets, in the same order and with the same tokens as the formatted csv file
+
+		Example
+		-------
+			>>> corpus = ingestFile('./dataset/original', 'bbchealth', csvDirectory='./dataset/csv')
+			>>> corpus[0]
+			['breast', 'cancer', 'risk', 'test', 'devised']
+	'''
+	vocabulary = Vocabulary()
+	# the token ids and the offsets grow in compact buffers instead of one array per tweet
+	tokens, offsets = array('i'), array('q', [0])
+
+	with ExitStack() as stack:
+		textFile = stack.enter_context(open(f'{ inputDirectory }/{ fileName }.txt', 'r', encoding='ISO-8859-1'))
+		writer = None
+		if csvDirectory is not None:
+			csvFile = stack.enter_context(open(f'{ csvDirectory }/{ fileName }.csv', 'w', encoding='utf-8'))
+			writer = csv.writer(csvFile)
+			writer.writerow(['id', 'date', 'time', 'tweet', 'links', 'mentions', 'hashtags'])
+
+		for line in tqdm(textFile, desc=f'Ingesting { fileName }', disable=not progress):
+			# splitlines also splits on the rarer line breaks, like textToCsv does
+			for dataLine in line.splitlines():
+				data = formatData(dataLine)
+				if data == []:
+					continue
+
+				row = formatLine(data)
+				if writer is not None:
+					writer.writerow(row)
+				# an empty tweet is read as NaN by pandas, keep the same 'nan' token as the csv readers
+				tokens.extend(sorted({vocabulary.intern(token) for token in (row[3] or 'nan').split()}))
+				offsets.append(len(tokens))
+
+	return Corpus(vocabulary, numpy.frombuffer(tokens, dtype=numpy.int32), numpy.frombuffer(offsets, dtype=numpy.int64))
+
+
+def main():
+	'''
+		Ingests all txt files of the input directory, saving the corpus of every file in its own directory
+		of the output directory, and the formatted csv files in the csv directory if it is set
+
+		Parameters
+		----------
+			None
+
+		Returns
+		-------
+			None
+
+		Example
+		-------
+			>>> main()
+			# Writes ./dataset/corpus/bbchealth/, ./dataset/csv/bbchealth.csv, ...
+	'''
+	config = Configuration.load_json("./config/ingest.json")  # Load the config file
+
+	if not exists(config["inputDirectory"]):  # Check if the input directory exists
+		print(f'The input directory { config["inputDirectory"] } does not exist\n')
+		return
+
+	for directory in (config["outputDirectory"], config["csvDirectory"]):
+		if directory is not None:
+			makedirs(directory, exist_ok=True)
+
+	print('Ingesting text files...\n')
+
+	for file in tqdm(filesInDirectory(config["inputDirectory"]), desc="Ingesting Files"):  # tqdm is a progress bar
+		# Splits the file name and removes the extension
+		fileName = file.split('.')[0]
+		corpus = ingestFile(config["inputDirectory"], fileName, config["csvDirectory"])
+		corpus.save(join(config["outputDirectory"], fileName))
+
+	print('\nIngestion is Done Successfully!')
+
+
+if __name__ == '__main__':
+	main()
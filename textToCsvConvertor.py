@@ -1,6 +1,7 @@
 import csv  # Import the csv module
+import io
 import re
-from datetime import datetime  # Import the datetime module
+from datetime import date, datetime, time  # Import the datetime module
 from os import mkdir  # Import the listdir function from the os module
 from os.path import exists
 
@@ -10,9 +11,25 @@ from app.utils.configurationReader import \
     Configuration  # Import the Confugration class to read the config file
 from app.utils.files import \
     filesInDirectory  # Import the filesInDirectory function from the files module
+from app.utils.manifest import (  # Import the Manifest class to skip the files already converted
+    Manifest, processFiles)
+
+# The version of the conversion, bump it when the csv files change for the same text files
+CONVERSION_VERSION = 1
 
 # The pattern to find the links in the tweet
 URL_PATTERN = r'(?i)\b((?:[a-z][\w-]+:(?:/{1,3}|[a-z0-9%])|www\d{0,3}[.]|[a-z0-9.\-]+[.][a-z]{2,4}/)(?:[^\s()<>]+|\(([^\s()<>]+|(\([^\s()<>]+\)))*\))+(?:\(([^\s()<>]+|(\([^\s()<>]+\)))*\)|[^\s`!()\[\]{};:\'".,<>?«»“”‘’]))'
+URL_REGEX = re.compile(URL_PATTERN)
+
+# The UTF-8 punctuation that was decoded as ISO-8859-1, and what it is replaced with
+# "Â" is a single character so it is deleted by a translation table, the longer sequences are replaced in one pass
+MOJIBAKE_TABLE = str.maketrans({'Â': None})
+MOJIBAKE_REPLACEMENTS = {'â€™': "'", 'â€œ': '"', 'â€“': '-', 'â€': '"'}
+MOJIBAKE_REGEX = re.compile('|'.join(re.escape(sequence) for sequence in MOJIBAKE_REPLACEMENTS))
+
+# Lookup tables of the fixed timestamp format, like 'Thu Apr 09 01:31:50 +0000 2015'
+WEEKDAYS = frozenset(['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'])
+MONTHS = {month: index + 1 for index, month in enumerate(['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'])}
 
 def formatData(data: str) -> list[str]:
 	'''
@@ -40,18 +57,21 @@ def formatData(data: str) -> list[str]:
 		id, dateTimeText, *wholeTweet = data.split('|')
 		wholeTweet = ''.join(wholeTweet)  # Join the rest of the tweet
 
-		# Find all the links in the tweet
-		extractedLinks = [url[0] for url in re.findall(URL_PATTERN, wholeTweet)] 
+		# Find all the links in the tweet and remove them in the same pass
+		extractedLinks = []
+		tweet = URL_REGEX.sub(lambda url: extractedLinks.append(url.group(1)) or '', wholeTweet)
 		links = ','.join(extractedLinks)  # Join the links
-		tweet = re.sub(URL_PATTERN, '', wholeTweet)  # Remove the links from the tweet
 
 		# clean the tweet of any special characters
-		tweet = tweet.replace("Â", "").replace("â€™", "'").replace("â€œ", '"').replace('â€“', '-').replace('â€', '"').strip()
+		tweet = tweet.translate(MOJIBAKE_TABLE)
+		if 'â€' in tweet:
+			tweet = MOJIBAKE_REGEX.sub(lambda sequence: MOJIBAKE_REPLACEMENTS[sequence.group()], tweet)
+		tweet = tweet.strip()
 
-		# Convert the dateTimeText to a datetime object
-		dateTimeObject = datetime.strptime(dateTimeText, '%a %b %d %H:%M:%S %z %Y')
+		# Convert the dateTimeText to a date and a time
+		tweetDate, tweetTime = parseTimestamp(dateTimeText)
 		
-		return [id, dateTimeObject.date(), dateTimeObject.time(), tweet, links]
+		return [id, tweetDate, tweetTime, tweet, links]
 	except ValueError:
 		# Catch the error if the data is not in the correct format and return an empty list
 		# This is to prevent the program from crashing
@@ -59,38 +79,95 @@ def formatData(data: str) -> list[str]:
 		return []
 
 
-def textToCsv(inputDirectory: str, outputDirectory: str, fileName: str):
+def parseTimestamp(dateTimeText: str) -> tuple[date, time]:
+	'''
+		Parses a timestamp of the format '%a %b %d %H:%M:%S %z %Y' into its date and time
+		The fixed layout is split and looked up directly, anything else falls back to datetime.strptime
+
+		Parameters
+		----------
+			dateTimeText: str
+				The timestamp to parse
+
+		Returns
+		-------
+			tuple[date, time]
+				The date and the time, in the time zone of the timestamp
+
+		Raises
+		------
+			ValueError
+				If the timestamp is not in the expected format
+
+		Example
+		-------
+			>>> parseTimestamp('Thu Apr 09 01:31:50 +0000 2015')
+			(datetime.date(2015, 4, 9), datetime.time(1, 31, 50))
+	'''
+	parts = dateTimeText.split(' ')
+	if len(parts) == 6:
+		weekday, month, day, clock, zone, year = parts
+		digits = day + year + clock[:2] + clock[3:5] + clock[6:] + zone[1:]
+		if (weekday in WEEKDAYS and month in MONTHS and len(digits) == 16 and len(clock) == 8
+			and clock[2] == clock[5] == ':' and zone[:1] in ('+', '-') and digits.isascii() and digits.isdigit()):
+			return (
+				date(int(year), MONTHS[month], int(day)),
+				time(int(clock[:2]), int(clock[3:5]), int(clock[6:])),
+			)
+
+	dateTimeObject = datetime.strptime(dateTimeText, '%a %b %d %H:%M:%S %z %Y')
+	return dateTimeObject.date(), dateTimeObject.time()
+
+
+def textToCsv(inputDirectory: str, outputDirectory: str, fileName: str, offset: int = 0, progress: bool = True) -> str:
 	'''
 		Converts the text file to csv file
+		The lines are read, formatted and written one by one, so only one line is in memory at a time
 		
 		Parameters
 		----------
+			inputDirectory: str
+				The directory of the text file
+
+			outputDirectory: str
+				The directory to write the csv file in
+
 			fileName: str
 				The name of the file to be converted
 
+			offset: int
+				The byte offset to convert the text file from, the converted lines are appended to the csv file
+				when it is not 0, it must be the start of a line
+
+			progress: bool
+				Show a progress bar of the lines formatted
+
 		Returns
 		-------
-			None
+			str
+				The name of the converted file
 			
 		Example
 		-------
-			>>> textToCsv('foxnewshealth')
+			>>> textToCsv('./dataset/original', './dataset/csv', 'foxnewshealth')
 			# Writes the csv file to the output directory
 	'''
-	with open(f'{ inputDirectory }/{ fileName }.txt', 'r', encoding='ISO-8859-1') as textFile:  # Open the text file
-		# Get the data from the text file as a list of lines
-		dataLines = textFile.read().splitlines()
-		# Iterate through the data and format it
-		data = [formatData(line) for line in tqdm(dataLines, desc=f"Formating {fileName}")]
-		# Remove the empty lines
-		data = [line for line in data if line != []]
-
-		with open(f'{ outputDirectory }/{ fileName }.csv', 'w', encoding='utf-8') as csvFile:  # Open the csv file
-			writer = csv.writer(csvFile)  # Create a csv.writer object
+	with open(f'{ inputDirectory }/{ fileName }.txt', 'rb') as rawFile, \
+		open(f'{ outputDirectory }/{ fileName }.csv', 'a' if offset else 'w', encoding='utf-8') as csvFile:
+		rawFile.seek(offset)
+		textFile = io.TextIOWrapper(rawFile, encoding='ISO-8859-1')
+		writer = csv.writer(csvFile)  # Create a csv.writer object
+		if offset == 0:
 			# Write the header
 			writer.writerow(['id', 'date', 'time', 'tweet', 'links'])
-			# Write the data to the csv file (Note: the data is a list of lists of strings)
-			writer.writerows(data)
+		for line in tqdm(textFile, desc=f"Formating {fileName}", disable=not progress):
+			# splitlines also splits on the rarer line breaks, like reading the whole file did
+			for dataLine in line.splitlines():
+				data = formatData(dataLine)
+				# Skip the lines that are not in the correct format
+				if data != []:
+					writer.writerow(data)
+	return fileName
 
 
 def main():
@@ -128,10 +205,19 @@ def main():
 
 	# Get the list of files in the input directory
 	files = filesInDirectory(config["inputDirectory"])
-
-	for file in tqdm(files, desc="Formating Files"):  # tqdm is a progress bar
+	# The files converted by a previous run are skipped, the files that were appended to only convert their new lines
+	manifest = Manifest(config["outputDirectory"], 'conversion', CONVERSION_VERSION)
+	tasks = []
+	for file in files:
 		# Splits the file name and removes the extension
-		textToCsv(config["inputDirectory"], config["outputDirectory"], file.split('.')[0])
+		fileName = file.split('.')[0]
+		action, offset = manifest.plan(f'{ config["inputDirectory"] }/{ fileName }.txt', f'{ config["outputDirectory"] }/{ fileName }.csv')
+		if action != 'skip':
+			tasks.append((config["inputDirectory"], config["outputDirectory"], fileName, offset))
+	print(f'{ len(files) - len(tasks) } files are up to date, { len(tasks) } files to convert\n')
+
+	# The files are converted by config["jobs"] processes at the same time
+	processFiles(manifest, tasks, textToCsv, '.txt', config.get("jobs"), "Converting Files")
 
 	# Print a message to the console
 	print('\nConversion is Done Successfully!')